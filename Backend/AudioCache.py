@@ -0,0 +1,114 @@
+from collections import OrderedDict  # Import OrderedDict for least-recently-used ordering.
+from dotenv import dotenv_values  # Import dotenv to read the cache settings.
+import hashlib  # Import hashlib for content-addressed file names.
+import threading  # Import threading so the cache can be shared between threads.
+import os  # Import os for file handling.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Where synthesized clips are kept, and the most megabytes they may take up.
+AudioCacheDir = os.path.join("Data", "AudioCache")
+AudioCacheMB = float(env_vars.get("AudioCacheMB", 50))
+
+# Function to build the cache key of a clip from everything that changes how it sounds.
+def AudioKey(Text, Voice, Pitch, Rate):
+    return hashlib.sha256(f"{Text}\0{Voice}\0{Pitch}\0{Rate}".encode("utf-8")).hexdigest()
+
+# On-disk cache of synthesized speech, one MP3 per key, evicting the least recently used past the size limit.
+class AudioCache:
+
+    def __init__(self, Directory=AudioCacheDir, MaxBytes=int(AudioCacheMB * 1024 * 1024)):
+        self.Directory = Directory
+        self.MaxBytes = MaxBytes
+        self._entries = OrderedDict()  # key -> size in bytes, oldest use first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.Hits = 0
+        self.Misses = 0
+        self.Evictions = 0
+        self._Load()
+
+    # Function to get the file path of a key.
+    def Path(self, Key):
+        return os.path.join(self.Directory, f"{Key}.mp3")
+
+    # Return the path of the cached clip for a key, or None.
+    def Get(self, Key):
+        with self._lock:
+            if Key not in self._entries or not os.path.exists(self.Path(Key)):
+                self._Forget(Key)
+                self.Misses += 1
+                return None
+            self._entries.move_to_end(Key)
+            self.Hits += 1
+        try:
+            os.utime(self.Path(Key))  # Keeps the use order across restarts.
+        except OSError:
+            pass
+        return self.Path(Key)
+
+    # Check whether a key is cached, without touching the counters or the use order.
+    def Contains(self, Key):
+        with self._lock:
+            return Key in self._entries
+
+    # Store a clip and return its path.
+    def Put(self, Key, Data):
+        path = self.Path(Key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(Data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._Forget(Key)
+            self._entries[Key] = len(Data)
+            self._bytes += len(Data)
+            self._Evict(keep=Key)
+        return path
+
+    # Return the hit/miss counters.
+    def Stats(self):
+        with self._lock:
+            lookups = self.Hits + self.Misses
+            return {
+                "Clips": len(self._entries),
+                "Bytes": self._bytes,
+                "Hits": self.Hits,
+                "Misses": self.Misses,
+                "HitRate": self.Hits / lookups if lookups else 0.0,
+                "Evictions": self.Evictions,
+            }
+
+    def _Forget(self, Key):
+        size = self._entries.pop(Key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _Evict(self, keep=None):
+        for Key in list(self._entries):
+            if self._bytes <= self.MaxBytes:
+                return
+            if Key == keep:
+                continue
+            try:
+                os.remove(self.Path(Key))
+            except OSError:
+                continue  # Still playing; try again on the next store.
+            self._Forget(Key)
+            self.Evictions += 1
+
+    def _Load(self):
+        try:
+            os.makedirs(self.Directory, exist_ok=True)
+            files = []
+            for name in os.listdir(self.Directory):
+                if name.endswith(".mp3"):
+                    stat = os.stat(os.path.join(self.Directory, name))
+                    files.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, Key, size in sorted(files):
+                self._entries[Key] = size
+                self._bytes += size
+            self._Evict()
+        except OSError as e:
+            print(f"Error loading audio cache: {e}")
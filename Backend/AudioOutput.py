@@ -0,0 +1,121 @@
+from collections import deque  # Import deque for the clips waiting to play.
+from time import perf_counter  # Import perf_counter to time the clips that were played.
+import threading  # Import threading for the feeder thread and its lock.
+import pygame  # Import pygame for the mixer.
+import io  # Import io to decode clips straight from memory.
+
+# edge-tts produces 24 kHz mono audio; opening the mixer in that format avoids resampling.
+MixerFrequency = 24000
+MixerChannels = 1
+
+# How often (seconds) the feeder and waiters look at the channel.
+PollInterval = 0.01
+
+# Number of played clips remembered with their text and times, to recognise their echo in the microphone.
+HistorySize = 50
+
+# Long-lived audio output: the mixer is opened once, clips are decoded from memory, and the next clip is
+# always queued on the channel behind the one playing, so consecutive clips play without a gap.
+class AudioOutput:
+
+    def __init__(self):
+        self.Pending = deque()  # Decoded clips not yet handed to the channel.
+        self.Lock = threading.Condition()
+        self.Channel = None
+        self.Feeder = None
+        self.Clips = 0
+        self.History = deque(maxlen=HistorySize)  # [text, start, end] of each clip, on the perf_counter clock.
+        self.PlayingUntil = 0.0  # When the last queued clip will have finished.
+
+    # Open the mixer and start the feeder thread, once.
+    def Start(self):
+        with self.Lock:
+            if self.Channel is not None:
+                return
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=MixerFrequency, channels=MixerChannels)
+            pygame.mixer.set_reserved(1)
+            self.Channel = pygame.mixer.Channel(0)
+            self.Feeder = threading.Thread(target=self._Feed, name="AudioOutput", daemon=True)
+            self.Feeder.start()
+
+    # Decode a clip (MP3 or WAV bytes) and queue it to play after everything already queued; Text is what it says.
+    def Enqueue(self, Data, Text=""):
+        self.Start()
+        Sound = pygame.mixer.Sound(file=io.BytesIO(Data))
+        Length = Sound.get_length()
+        with self.Lock:
+            self.Pending.append(Sound)
+            self.Clips += 1
+            Begin = max(perf_counter(), self.PlayingUntil)  # Clips play back to back.
+            self.PlayingUntil = Begin + Length
+            self.History.append([Text, Begin, self.PlayingUntil])
+            self.Lock.notify()
+        return Length
+
+    # Stop playback at once and drop every queued clip.
+    def Stop(self):
+        with self.Lock:
+            self.Pending.clear()
+            if self.Channel is not None:
+                self.Channel.stop()  # Also clears the clip queued on the channel.
+            Now = perf_counter()
+            while self.History and self.History[-1][1] >= Now:
+                self.History.pop()  # Never started.
+            if self.History and self.History[-1][2] > Now:
+                self.History[-1][2] = Now  # Cut short.
+            self.PlayingUntil = Now
+
+    # Return the text of the clips that were playing at any time between Begin and End (perf_counter times).
+    def PlayedBetween(self, Begin, End):
+        with self.Lock:
+            return " ".join(Text for Text, Started, Ended in self.History if Started < End and Ended > Begin and Text)
+
+    # Check whether anything is playing or waiting to play.
+    def Busy(self):
+        with self.Lock:
+            return bool(self.Pending) or (self.Channel is not None and self.Channel.get_busy())
+
+    # Block until playback is finished; func is polled and returning False stops playback early.
+    def Wait(self, func=lambda r=None: True):
+        while self.Busy():
+            if func() == False:
+                self.Stop()
+                return False
+            with self.Lock:
+                self.Lock.wait(PollInterval)
+        return True
+
+    # Close the mixer (only needed when the program exits).
+    def Close(self):
+        self.Stop()
+        with self.Lock:
+            self.Channel = None
+            self.Lock.notify()
+        pygame.mixer.quit()
+
+    # Hand pending clips to the channel. With nothing pending it sleeps until Enqueue or Close wakes it; it only
+    # polls while a clip waits for room on the channel.
+    def _Feed(self):
+        with self.Lock:
+            while self.Channel is not None:
+                if not self.Pending:
+                    self.Lock.wait()
+                    continue
+                if not self.Channel.get_busy():
+                    self.Channel.play(self.Pending.popleft())
+                elif self.Channel.get_queue() is None:
+                    self.Channel.queue(self.Pending.popleft())
+                if self.Pending:
+                    self.Lock.wait(PollInterval)
+
+Output = None
+OutputLock = threading.Lock()
+
+# Function to get the audio output shared by the whole assistant.
+def GetAudioOutput():
+    global Output
+    with OutputLock:
+        if Output is None:
+            Output = AudioOutput()
+        return Output
@@ -5,17 +5,19 @@ from pywhatkit import search, playonyt  # Import Google search and YouTube playb
 from dotenv import dotenv_values  # Import dotenv to manage environment variables.
 from bs4 import BeautifulSoup  # Import BeautifulSoup for HTML content.
 from rich import print  # Import rich print.
-from groq import Groq  # Import Groq for AI conversation.
 import webbrowser  # Import webbrowser for opening the system.
 import subprocess  # Import subprocess for interactions with the system.
 import requests  # Import requests for web operations.
 import keyboard  # Import keyboard for keyboard-related actions.
 import asyncio  # Import asyncio for asynchronous programming.
 import os  # Import os for operating system functionalities.
+import sys  # Import sys to make the Backend package importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.LLMGateway import StreamChat  # Import the shared, pooled LLM client layer.
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
-GroqAPIKey = env_vars.get("GroqAPIKey")
 
 # Define CSS Classes for parsing specific elements in HTML content
 classes = ["cZubwf", "hgKElc", "LTKOO SY7ric", "Z0Lcw", "gsrt vk_bk FzvWSb YwPhnf", 
@@ -26,9 +28,6 @@ classes = ["cZubwf", "hgKElc", "LTKOO SY7ric", "Z0Lcw", "gsrt vk_bk FzvWSb YwPhn
 # Define a user-agent for making web requests.
 useragent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36'
 
-# Initialize the Groq Client with the API key.
-Client = Groq(api_key=GroqAPIKey)
-
 # Predefined professional responses for user interactions.
 professional_responses = [
     "Your satisfaction is my top priority; feel free to reach out if there's anything else I can help you with.",
@@ -46,8 +45,8 @@ def GoogleSearch(Topic):
     search(Topic)  # Use pywhatkit's search function to perform a Google search.
     return True  # Indicate success.
 
-# Function to generate content using AI and save it to a file.
-def Content(Topic):
+# Function to generate content using AI and save it to a file; OnDelta receives the text as it streams in.
+def Content(Topic, OnDelta=None):
     # Nested function to open a file in Notepad.
     def OpenNotepad(File):
         default_text_editor = 'notepad.exe'  # Default text editor is notepad.
@@ -56,22 +55,23 @@ def Content(Topic):
     def ContentWriterAI(prompt):
         messages.append({"role": "user", "content": f"{prompt}"})  # Add the user's prompt to messages.
 
-        completion = Client.chat.completions.create(
-            model="llama3-70b-8192",  # or another valid model from your account
-            messages=SystemChatBot + messages,  # Include system instructions and chat history.
+        completion = StreamChat(
+            "content",  # Model alias from LLMGateway (ContentModel in .env).
+            SystemChatBot + messages,  # Include system instructions and chat history.
             max_tokens=2048,  # Limit the maximum tokens in the response.
             temperature=0.7,  # Adjust response randomness.
             top_p=1,  # Use nucleus sampling for response diversity.
-            stream=True,  # Enable streaming response.
             stop=None  # Allow the model to determine stopping conditions.
         )
 
         Answer = ""  # Initialize an empty string for the response.
 
-            # Process streamed response chunks.
-        for chunk in completion:
-            if chunk.choices[0].delta.content:  # Check for content in the current chunk.
-                Answer += chunk.choices[0].delta.content  # Append the content to the answer.
+            # Process streamed response pieces.
+        for Delta in completion:
+            if Delta:  # Check for content in the current piece.
+                Answer += Delta  # Append the content to the answer.
+                if OnDelta is not None:
+                    OnDelta(Delta.replace("</s>", ""))  # Pass the new text on as it arrives.
 
         Answer = Answer.replace("</s>", "")  # Remove unwanted tokens from the response.
         messages.append({"role": "assistant", "content": Answer})  # Add the AI's response to messages.
@@ -180,7 +180,7 @@ def System(command):
     return True  # Indicate success.
 
 # Asynchronous function to translate and execute user commands.
-async def TranslateAndExecute(commands: list[str]):
+async def TranslateAndExecute(commands: list[str], OnContentDelta=None):
 
     funcs = []  # List to store asynchronous tasks.
 
@@ -208,7 +208,7 @@ async def TranslateAndExecute(commands: list[str]):
             funcs.append(fun)
 
         elif command.startswith("content "):  # Handle "content" commands.
-            fun = asyncio.to_thread(Content, command.removeprefix("content "))
+            fun = asyncio.to_thread(Content, command.removeprefix("content "), OnContentDelta)
             funcs.append(fun)
 
         elif command.startswith("google search "):  # Handle Google search commands.
@@ -234,9 +234,9 @@ async def TranslateAndExecute(commands: list[str]):
         else:
             yield result
 
-async def Automation(commands: list[str]):
+async def Automation(commands: list[str], OnContentDelta=None):
 
-    async for result in TranslateAndExecute(commands):
+    async for result in TranslateAndExecute(commands, OnContentDelta):
         pass
 
     return True
@@ -0,0 +1,56 @@
+import threading  # Import threading for the cancellation flag and its lock.
+
+# Raised by code that notices it was cancelled and has nothing sensible to return.
+class Cancelled(Exception):
+    pass
+
+# A flag shared by everything working on one turn: listening, the model streams and speech.
+# Cancelling it sets the flag and runs the registered callbacks once, so blocked work stops at once.
+class CancelToken:
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.Reason = None
+
+    # Cancel the work; later calls do nothing.
+    def Cancel(self, Reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.Reason = Reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for Callback in callbacks:
+            try:
+                Callback()
+            except Exception as e:
+                print(f"Error in cancel callback: {e}")
+
+    @property
+    def Cancelled(self):
+        return self._event.is_set()
+
+    # Run Callback when the token is cancelled (at once if it already was); returns a function that unregisters it.
+    def OnCancel(self, Callback):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(Callback)
+                return lambda: self._Remove(Callback)
+        Callback()
+        return lambda: None
+
+    # Raise Cancelled if the token was cancelled.
+    def Check(self):
+        if self._event.is_set():
+            raise Cancelled(self.Reason)
+
+    # Block until the token is cancelled or Timeout seconds pass; returns whether it was cancelled.
+    def Wait(self, Timeout=None):
+        return self._event.wait(Timeout)
+
+    def _Remove(self, Callback):
+        with self._lock:
+            if Callback in self._callbacks:
+                self._callbacks.remove(Callback)
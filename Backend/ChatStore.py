@@ -0,0 +1,116 @@
+from json import loads, dumps, load  # Import JSON helpers for one-message-per-line records.
+from collections import deque  # Import deque for the bounded in-memory tail.
+from dotenv import dotenv_values  # Import dotenv to read the store settings.
+import threading  # Import threading so appends from several backends never interleave.
+import os  # Import os for file handling.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Path of the append-only log, one JSON message per line.
+ChatLogPath = os.path.join("Data", "ChatLog.jsonl")
+
+# Old whole-file JSON logs, migrated once into the append-only log (both spellings the backends used).
+LegacyChatLogPaths = [os.path.join("Data", "ChatLog.json"), r"Data\ChatLog.json"]
+
+# Number of most recent messages kept in memory.
+ChatTailSize = int(env_vars.get("ChatTailSize", 1000))
+
+# Append-only conversation store shared by the chatbot, the search engine and Main.
+class ChatStore:
+
+    def __init__(self, Path=ChatLogPath, TailSize=ChatTailSize):
+        self.Path = Path
+        self._lock = threading.Lock()
+        self._tail = deque(maxlen=TailSize)
+        self.Count = 0  # Total messages in the log, including those no longer in the tail.
+        self._partial = False  # Whether the file ends in a partial line that the next append must start after.
+
+        directory = os.path.dirname(self.Path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not os.path.exists(self.Path):
+            self._Migrate()
+        self._Load()
+
+    # Return a copy of the most recent messages, oldest first.
+    def Messages(self):
+        with self._lock:
+            return list(self._tail)
+
+    # Return the total message count together with a copy of the tail, read consistently.
+    def Snapshot(self):
+        with self._lock:
+            return self.Count, list(self._tail)
+
+    # Append one or more messages as a single write, so a crash never leaves half a turn behind.
+    def Append(self, *Messages):
+        data = "".join(dumps(message, ensure_ascii=False) + "\n" for message in Messages)
+        with self._lock:
+            with open(self.Path, "a", encoding="utf-8") as f:
+                f.write("\n" + data if self._partial else data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._partial = False
+            self._tail.extend(Messages)
+            self.Count += len(Messages)
+
+    # Append a user query and the assistant's answer together.
+    def AppendTurn(self, Query, Answer):
+        self.Append({"role": "user", "content": Query}, {"role": "assistant", "content": Answer})
+
+    # Drop the whole conversation.
+    def Clear(self):
+        with self._lock:
+            self._Write([])
+            self._tail.clear()
+            self.Count = 0
+            self._partial = False
+
+    # Read the log into the tail, skipping a partial last line left by a crash.
+    def _Load(self):
+        with self._lock:
+            with open(self.Path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._partial = not line.endswith("\n")
+                    if not line.strip():
+                        continue
+                    try:
+                        self._tail.append(loads(line))
+                        self.Count += 1
+                    except ValueError:
+                        print(f"Skipping unreadable line in {self.Path}")
+
+    # Replace the log atomically with the given messages.
+    def _Write(self, Messages):
+        temp_path = f"{self.Path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(dumps(message, ensure_ascii=False) + "\n" for message in Messages)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.Path)
+
+    # One-time import of the old ChatLog.json; the old file is left in place untouched.
+    def _Migrate(self):
+        messages = []
+        for path in LegacyChatLogPaths:
+            try:
+                if os.path.exists(path) and os.stat(path).st_size > 0:
+                    with open(path, "r", encoding="utf-8") as f:
+                        messages = load(f)
+                    break
+            except Exception as e:
+                print(f"Error migrating {path}: {e}")
+        self._Write(messages)
+
+Store = None
+StoreLock = threading.Lock()
+
+# Function to get the shared chat store, opening it on first use.
+def GetChatStore():
+    global Store
+    with StoreLock:
+        if Store is None:
+            Store = ChatStore()
+        return Store
@@ -1,22 +1,21 @@
-from groq import Groq  # Importing the Groq library to use its API.
-from json import load, dump  # Importing functions to read and write JSON files.
 import datetime  # Importing the datetime module for real-time date-and-time information.
+import asyncio  # Importing asyncio to write the chat log off the event loop.
 from dotenv import dotenv_values  # Importing dotenv_values to read environment variables.
+import sys
 import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.ChatStore import GetChatStore  # Importing the shared append-only chat log.
+from Backend.ContextWindow import ContextWindow  # Importing the token-budgeted context builder.
+from Backend.LLMGateway import AStreamChat, Chat  # Importing the shared, pooled LLM client layer.
+from Backend.EventLoop import RunSync, Stream  # Importing the shared event loop the requests run on.
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values('.env')
 
-# Retrieve specific environment variables for username, assistant name, and API key.
+# Retrieve specific environment variables for username and assistant name.
 Username = env_vars.get('Username')
 Assistantname = env_vars.get('Assistantname')
-GroqAPIKey = env_vars.get('GroqAPIKey')
-
-# Initialize the Groq client using the provided API key.
-Client = Groq(api_key=GroqAPIKey)
-
-# Initialize an empty list to store chat messages.
-messages = []
 
 # Define a system message that provides context to the AI chatbot about its role and behavior.
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which also has real-time up-to-date information from the internet.
@@ -30,20 +29,6 @@ SystemChatBot = [
     {"role": "system", "content": System}
 ]
 
-# Attempt to load the chat logs from a JSON file.
-try:
-    if not os.path.exists("Data/ChatLog.json") or os.stat("Data/ChatLog.json").st_size == 0:
-        # If the file doesn't exist or is empty, initialize with an empty list
-        with open("Data/ChatLog.json", "w") as f:
-            dump([], f)
-
-    # Now safely load
-    with open("Data/ChatLog.json", "r") as f:
-        messages = load(f)
-except Exception as e:
-    print(f"Error loading ChatLog.json: {e}")
-    messages = []
-
 # Function to get real-time date and time information.
 def RealtimeInformation():
     current_date_time = datetime.datetime.now()  # Get the current date and time.
@@ -60,6 +45,23 @@ def RealtimeInformation():
     data += f"Time: {hour} hours {minute} minutes {second} seconds.\n"
     return data
 
+# Function to fold older turns into the running summary of the conversation.
+def SummarizeHistory(Summary, Messages):
+    Transcript = "\n".join(f"{message['role']}: {message['content']}" for message in Messages)
+    NewSummary = Chat(
+        "summary",
+        [
+            {"role": "system", "content": "Update the running summary of a conversation between a user and an AI assistant. Keep names, facts, preferences and open questions; drop small talk. Reply with the summary only, in under 200 words."},
+            {"role": "user", "content": f"Current summary:\n{Summary or '(none)'}\n\nNew turns:\n{Transcript}"}
+        ],
+        max_tokens=300,
+        temperature=0.3
+    )
+    return NewSummary.strip()
+
+# Build each request from a token budget: a running summary plus the last few turns verbatim.
+Context = ContextWindow(GetChatStore(), SummarizeHistory)
+
 # Function to modify the chatbot's response for better formatting.
 def AnswerModifier(answer):
     lines = answer.split("\n")  # Split the response into lines.
@@ -67,58 +69,75 @@ def AnswerModifier(answer):
     modified_answer = "\n".join(non_empty_lines)  # Join the cleaned lines back together.
     return modified_answer
 
-# Main chatbot function to handle user queries.
-def ChatBot(Query):
-    """This function sends the user's query to the chatbot and returns the AI's response."""
+# Streaming chatbot function that yields the AI's response as text deltas while it is generated, on the shared event loop.
+async def AChatBotStream(Query, Retry=True, Record=True, Cancel=None):
+    """This function sends the user's query to the chatbot and yields the AI's response piece by piece.
+    With Record=False the turn is not written to the chat log (used for speculative answers).
+    Cancelling the optional CancelToken ends the stream early; an interrupted answer is not logged."""
 
-    try:
-        # Load the existing chat log from the JSON file.
-        with open(r"Data\ChatLog.json", "r") as f:
-            messages = load(f)
-
-        # Append the user's query to the messages list.
-        messages.append({"role": "user", "content": Query})
+    Started = False  # Whether any part of the answer has been yielded yet.
 
-        # Make a request to the Groq API for a response.
-        completion = Client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[{"role": "system", "content": RealtimeInformation()}] + messages,
+    try:
+        # Build the request from the summary, the recent chat history and the user's query.
+        Store = GetChatStore()
+        messages = Context.Build([{"role": "system", "content": RealtimeInformation()}], Query)
+
+        # Make a streaming request to the Groq API for a response.
+        completion = AStreamChat(
+            "chat",
+            messages,
             max_tokens=1024,
             temperature=0.6,
             top_p=1,
-            stream=True,
-            stop=None
+            stop=None,
+            Cancel=Cancel
         )
 
         # Initialize an empty string to store the AI's response.
         Answer = ""
 
-        # Process the streamed response chunks.
-        for chunk in completion:
-            if chunk.choices[0].delta.content:  # Check if there's content in the current chunk.
-                Answer += chunk.choices[0].delta.content  # Append the content to the answer.
+        # Process the streamed response, handing each piece to the caller as soon as it arrives.
+        async for Delta in completion:
+            if Delta:  # Check if there's content in the current piece.
+                Delta = Delta.replace("</s>", "")  # Clean up any unwanted tokens from the response.
+                Answer += Delta  # Append the content to the answer.
+                Started = True
+                yield Delta
 
-        Answer = Answer.replace("</s>", "")  # Clean up any unwanted tokens from the response.
+        # Append the query and the chatbot's response to the chat log, on a worker thread so the loop does not wait for the disk.
+        if Record and not (Cancel is not None and Cancel.Cancelled):
+            await asyncio.to_thread(Store.AppendTurn, Query, Answer)
 
-        # Append the chatbot's response to the messages list.
-        messages.append({"role": "assistant", "content": Answer})
+    except Exception as e:
+        # Handle errors by printing the exception; retry once if nothing was shown yet. The chat log is kept.
+        print(f"Error: {e}")
+        if Started or not Retry or (Cancel is not None and Cancel.Cancelled):
+            return
+        async for Delta in AChatBotStream(Query, Retry=False, Record=Record, Cancel=Cancel):
+            yield Delta
+
+# Streaming chatbot function for threads: the same stream, handed over from the event loop as it arrives.
+def ChatBotStream(Query, Retry=True, Record=True, Cancel=None):
+    return Stream(AChatBotStream(Query, Retry, Record, Cancel), Cancel)
 
-        # Save the updated chat log to the JSON file.
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
+# Async chatbot function that returns the whole formatted response.
+async def AChatBot(Query):
+    """This function sends the user's query to the chatbot and returns the AI's response."""
 
-        # Return the formatted response.
-        return AnswerModifier(answer=Answer)
+    Answer = "".join([Delta async for Delta in AChatBotStream(Query)])
 
-    except Exception as e:
-        # Handle errors by printing the exception and resetting the chat log.
-        print(f"Error: {e}")
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(Query)  # Retry the query after resetting the log.
+    # Return the formatted response.
+    return AnswerModifier(answer=Answer)
+
+# Main chatbot function to handle user queries.
+def ChatBot(Query):
+    """This function sends the user's query to the chatbot and returns the AI's response."""
+
+    return RunSync(AChatBot(Query))
 
 # Main program entry point.
 if __name__ == "__main__":
     while True:
         user_input = input("Enter Your Question: ")  # Prompt the user for a question.
         print(ChatBot(user_input))
+        print(Context.Stats())  # Show how many tokens the request carried.
@@ -0,0 +1,94 @@
+from dotenv import dotenv_values  # Import dotenv to read the packing budget.
+from collections import Counter  # Import Counter for term frequencies.
+from zlib import crc32  # Import crc32 to hash word shingles.
+import math  # Import math for the BM25 idf.
+import re  # Import re to split text into words.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.ContextWindow import EstimateTokens
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Most tokens of search context sent with one realtime request.
+SearchTokenBudget = int(env_vars.get("SearchTokenBudget", 1200))
+
+# Passages sharing at least this fraction of their shingles with a kept passage are dropped as near-duplicates.
+DuplicateThreshold = float(env_vars.get("DuplicateThreshold", 0.6))
+
+# BM25 parameters and shingle length (in words).
+BM25K1 = 1.5
+BM25B = 0.75
+ShingleWords = 4
+
+# Common words that carry no ranking signal.
+StopWords = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were", "be", "it", "this",
+    "that", "with", "as", "at", "by", "from", "what", "who", "how", "when", "where", "which", "me", "my", "you",
+    "your", "i", "tell", "about", "please", "can", "do", "does",
+}
+
+# Totals across packs, to see how much the packer saves.
+PackStats = {"Packs": 0, "Candidates": 0, "Duplicates": 0, "Packed": 0, "TokensIn": 0, "TokensOut": 0}
+
+# Function to split text into lowercase words without stop words.
+def Terms(text):
+    return [word for word in re.findall(r"\w+", str(text).lower()) if word not in StopWords]
+
+# Function to hash the overlapping word shingles of a text.
+def Shingles(text):
+    words = re.findall(r"\w+", str(text).lower())
+    if len(words) <= ShingleWords:
+        return {crc32(" ".join(words).encode())}
+    return {crc32(" ".join(words[i:i + ShingleWords]).encode()) for i in range(len(words) - ShingleWords + 1)}
+
+# Function to score each passage against the query with BM25.
+def BM25Scores(query, passages):
+    documents = [Counter(Terms(passage)) for passage in passages]
+    if not documents:
+        return []
+    lengths = [sum(document.values()) for document in documents]
+    average = sum(lengths) / len(lengths) or 1
+    frequency = Counter(term for document in documents for term in document)
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term in set(Terms(query)):
+            count = document.get(term, 0)
+            if not count:
+                continue
+            idf = math.log(1 + (len(documents) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+            score += idf * count * (BM25K1 + 1) / (count + BM25K1 * (1 - BM25B + BM25B * length / average))
+        scores.append(score)
+    return scores
+
+# Function to pick passages for a query: rank with BM25, drop near-duplicates, and fill the token budget
+# in score order. Passages are (source, text) pairs; ties keep their original order.
+def PackPassages(query, passages, budget=SearchTokenBudget):
+    passages = [(source, text.strip()) for source, text in passages if text and text.strip()]
+    scores = BM25Scores(query, [text for _, text in passages])
+    order = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+
+    packed, kept_shingles, duplicates, remaining = [], [], 0, budget
+    for i in order:
+        source, text = passages[i]
+        shingles = Shingles(text)
+        if any(len(shingles & kept) / min(len(shingles), len(kept)) >= DuplicateThreshold for kept in kept_shingles):
+            duplicates += 1
+            continue
+        cost = EstimateTokens(text)
+        if cost > remaining:
+            continue
+        packed.append((source, text))
+        kept_shingles.append(shingles)
+        remaining -= cost
+
+    PackStats["Packs"] += 1
+    PackStats["Candidates"] += len(passages)
+    PackStats["Duplicates"] += duplicates
+    PackStats["Packed"] += len(packed)
+    PackStats["TokensIn"] += sum(EstimateTokens(text) for _, text in passages)
+    PackStats["TokensOut"] += budget - remaining
+    return packed
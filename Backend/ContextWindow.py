@@ -0,0 +1,136 @@
+from json import load, dump  # Import JSON helpers to persist the running summary.
+from dotenv import dotenv_values  # Import dotenv to read the budget settings.
+import threading  # Import threading for the background summary worker.
+import os  # Import os for file handling.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Most tokens of history (summary plus recent turns) sent with one request, on top of the system prompt and query.
+ContextTokenBudget = int(env_vars.get("ContextTokenBudget", 3000))
+
+# Number of most recent turns (query and answer pairs) kept verbatim.
+ContextRecentTurns = int(env_vars.get("ContextRecentTurns", 6))
+
+# Where the running summary of older turns is kept between runs.
+SummaryPath = os.path.join("Data", "ChatSummary.json")
+
+# Function to estimate the number of tokens in a text (about four characters per token for English).
+def EstimateTokens(Text):
+    return len(str(Text)) // 4 + 1
+
+# Function to estimate the tokens of a list of chat messages, including a little overhead per message.
+def MessageTokens(Messages):
+    return sum(EstimateTokens(message["content"]) + 4 for message in Messages)
+
+# Builds each request from a token budget: a running summary of old turns plus the most recent turns verbatim.
+class ContextWindow:
+
+    def __init__(self, Store, Summarize, Budget=ContextTokenBudget, RecentTurns=ContextRecentTurns, Path=SummaryPath):
+        self.Store = Store
+        self.Summarize = Summarize  # Callable(old_summary, messages) -> new summary.
+        self.Budget = Budget
+        self.RecentTurns = RecentTurns
+        self.Path = Path
+        self.Summary = ""
+        self.Covered = 0  # Number of messages from the start of the log folded into the summary.
+        self._lock = threading.Lock()
+        self._worker = None
+        self.Requests = 0
+        self.LastRequestTokens = 0
+        self.TotalRequestTokens = 0
+        self.SummaryUpdates = 0
+        self._LoadSummary()
+
+    # Build the message list for one request and start a summary update if older turns are waiting to be folded.
+    def Build(self, SystemMessages, Query):
+        Count, Tail = self.Store.Snapshot()
+        Start = Count - len(Tail)  # Position of the first tail message in the whole log.
+
+        with self._lock:
+            if Count < self.Covered:  # The log was cleared, so the summary is stale.
+                self.Summary, self.Covered = "", 0
+            Summary, Covered = self.Summary, self.Covered
+
+        Fixed = list(SystemMessages)
+        if Summary:
+            Fixed.append({"role": "system", "content": f"Summary of the earlier conversation:\n{Summary}"})
+        QueryMessage = {"role": "user", "content": Query}
+        Remaining = self.Budget - MessageTokens(Fixed[len(SystemMessages):])
+
+        # Take unsummarized messages newest first until the budget runs out.
+        Recent = []
+        for message in reversed(Tail[max(Covered - Start, 0):]):
+            Cost = MessageTokens([message])
+            if Cost > Remaining:
+                break
+            Recent.append(message)
+            Remaining -= Cost
+        Recent.reverse()
+        if Recent and Recent[0]["role"] == "assistant":
+            Recent = Recent[1:]  # Never start the history halfway through a turn.
+
+        Request = Fixed + Recent + [QueryMessage]
+        Tokens = MessageTokens(Request)
+        with self._lock:
+            self.Requests += 1
+            self.LastRequestTokens = Tokens
+            self.TotalRequestTokens += Tokens
+
+        FoldUpTo = Count - self.RecentTurns * 2
+        if FoldUpTo > Covered:
+            self._StartSummaryUpdate(Tail[max(Covered - Start, 0):max(FoldUpTo - Start, 0)], FoldUpTo)
+
+        return Request
+
+    # Return the token counters for the requests built so far.
+    def Stats(self):
+        with self._lock:
+            return {
+                "Requests": self.Requests,
+                "LastRequestTokens": self.LastRequestTokens,
+                "TotalRequestTokens": self.TotalRequestTokens,
+                "AverageRequestTokens": self.TotalRequestTokens // self.Requests if self.Requests else 0,
+                "SummaryUpdates": self.SummaryUpdates,
+                "SummarizedMessages": self.Covered,
+            }
+
+    # Fold messages into the running summary on a background thread, one update at a time.
+    def _StartSummaryUpdate(self, Messages, FoldUpTo):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            Summary = self.Summary
+            self._worker = threading.Thread(target=self._UpdateSummary, args=(Summary, Messages, FoldUpTo), daemon=True)
+            self._worker.start()
+
+    def _UpdateSummary(self, Summary, Messages, FoldUpTo):
+        try:
+            NewSummary = self.Summarize(Summary, Messages) if Messages else Summary
+        except Exception as e:
+            print(f"Error updating chat summary: {e}")
+            return
+
+        with self._lock:
+            self.Summary = NewSummary
+            self.Covered = FoldUpTo
+            self.SummaryUpdates += 1
+            State = {"Summary": self.Summary, "Covered": self.Covered}
+
+        try:
+            temp_path = f"{self.Path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                dump(State, f, indent=4)
+            os.replace(temp_path, self.Path)
+        except OSError as e:
+            print(f"Error saving chat summary: {e}")
+
+    def _LoadSummary(self):
+        try:
+            if os.path.exists(self.Path):
+                with open(self.Path, "r", encoding="utf-8") as f:
+                    State = load(f)
+                self.Summary = State.get("Summary", "")
+                self.Covered = int(State.get("Covered", 0))
+        except Exception as e:
+            print(f"Error loading chat summary: {e}")
@@ -0,0 +1,113 @@
+from collections import OrderedDict  # Import OrderedDict for least-recently-used ordering.
+from json import load, dump  # Import JSON helpers for the on-disk copy.
+from dotenv import dotenv_values  # Import dotenv to read the cache settings.
+from time import time  # Import time for entry ages.
+import threading  # Import threading so the cache can be shared between threads.
+import re  # Import re for query normalization.
+import os  # Import os for file handling.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Cache settings: number of decisions kept, how long one stays valid, and whether it survives restarts.
+DecisionCacheSize = int(env_vars.get("DecisionCacheSize", 512))
+DecisionCacheTTL = float(env_vars.get("DecisionCacheTTL", 7 * 24 * 3600))
+DecisionCachePersist = str(env_vars.get("DecisionCachePersist", "True")).lower() != "false"
+DecisionCachePath = os.path.join("Data", "DecisionCache.json")
+
+# Function to reduce a query to its cache key: QueryModifier only changes case and end punctuation,
+# so lowercasing and dropping punctuation makes every spelling it produces map to the same key.
+def NormalizeQuery(Query):
+    Query = str(Query).lower().replace("'", "")
+    Query = re.sub(r"[^\w\s]", " ", Query)
+    return re.sub(r"\s+", " ", Query).strip()
+
+# Bounded LRU cache of FirstLayerDMM decisions with expiry, hit/miss counters and an optional file copy.
+class DecisionCache:
+
+    def __init__(self, MaxSize=DecisionCacheSize, TTL=DecisionCacheTTL, Path=DecisionCachePath if DecisionCachePersist else None):
+        self.MaxSize = MaxSize
+        self.TTL = TTL
+        self.Path = Path
+        self._entries = OrderedDict()  # key -> (decision, stored_at)
+        self._lock = threading.Lock()
+        self.Hits = 0
+        self.Misses = 0
+        self.Evictions = 0
+        self.Expired = 0
+        self._Load()
+
+    # Return the cached decision for a query, or None.
+    def Get(self, Query):
+        key = NormalizeQuery(Query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.Misses += 1
+                return None
+            decision, stored_at = entry
+            if time() - stored_at > self.TTL:
+                del self._entries[key]
+                self.Expired += 1
+                self.Misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.Hits += 1
+            return list(decision)
+
+    # Check whether a fresh decision is cached, without touching the counters or the LRU order.
+    def Contains(self, Query):
+        with self._lock:
+            entry = self._entries.get(NormalizeQuery(Query))
+            return entry is not None and time() - entry[1] <= self.TTL
+
+    # Store a decision for a query, evicting the least recently used ones past the size limit.
+    def Put(self, Query, Decision):
+        key = NormalizeQuery(Query)
+        if not key or not Decision:
+            return
+        with self._lock:
+            self._entries[key] = (list(Decision), time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MaxSize:
+                self._entries.popitem(last=False)
+                self.Evictions += 1
+            snapshot = [[key, decision, stored_at] for key, (decision, stored_at) in self._entries.items()]
+        self._Save(snapshot)
+
+    # Return the hit/miss counters.
+    def Stats(self):
+        with self._lock:
+            lookups = self.Hits + self.Misses
+            return {
+                "Size": len(self._entries),
+                "Hits": self.Hits,
+                "Misses": self.Misses,
+                "HitRate": self.Hits / lookups if lookups else 0.0,
+                "Evictions": self.Evictions,
+                "Expired": self.Expired,
+            }
+
+    def _Save(self, snapshot):
+        if not self.Path:
+            return
+        try:
+            temp_path = f"{self.Path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                dump(snapshot, f)
+            os.replace(temp_path, self.Path)
+        except OSError as e:
+            print(f"Error saving decision cache: {e}")
+
+    def _Load(self):
+        if not self.Path or not os.path.exists(self.Path):
+            return
+        try:
+            with open(self.Path, "r", encoding="utf-8") as f:
+                snapshot = load(f)
+            now = time()
+            for key, decision, stored_at in snapshot[-self.MaxSize:]:
+                if now - stored_at <= self.TTL:
+                    self._entries[key] = (decision, stored_at)
+        except Exception as e:
+            print(f"Error loading decision cache: {e}")
@@ -0,0 +1,75 @@
+import concurrent.futures  # Import concurrent.futures for the futures handed back to threads.
+import threading  # Import threading for the loop thread and its lock.
+import asyncio  # Import asyncio for the shared event loop.
+import queue  # Import queue to hand streamed items from the loop to a thread.
+
+# The one event loop shared by the backends, running on its own thread for the life of the program.
+# Threads (the pipeline stages, the GUI, the REPLs) hand it coroutines instead of calling asyncio.run,
+# so there is no loop to build and tear down per call, network calls overlap, and the async clients
+# keep their connection pools.
+Loop = None
+LoopThread = None
+LoopLock = threading.Lock()
+
+# Marks the end of a bridged stream.
+StreamEnd = object()
+
+# Function to start the shared event loop thread on first use.
+def GetLoop():
+    global Loop, LoopThread
+    with LoopLock:
+        if Loop is None:
+            Loop = asyncio.new_event_loop()
+            LoopThread = threading.Thread(target=Loop.run_forever, name="EventLoop", daemon=True)
+            LoopThread.start()
+        return Loop
+
+# Function to tell whether the caller is running on the shared loop's thread.
+def OnLoop():
+    return LoopThread is not None and threading.current_thread() is LoopThread
+
+# Function to schedule a coroutine on the shared loop from any thread; returns a concurrent future.
+def Submit(Coroutine):
+    return asyncio.run_coroutine_threadsafe(Coroutine, GetLoop())
+
+# Function to run a coroutine on the shared loop and wait for its result. Code already on the loop
+# must await the coroutine instead; blocking there would wait on itself.
+def RunSync(Coroutine, Timeout=None):
+    if OnLoop():
+        Coroutine.close()
+        raise RuntimeError("RunSync called on the event loop thread; await the coroutine instead")
+    Future = Submit(Coroutine)
+    try:
+        return Future.result(Timeout)
+    except concurrent.futures.TimeoutError:
+        Future.cancel()
+        raise
+
+# Function to iterate an async generator from a thread: it runs on the shared loop and its items are handed
+# over through a queue. Closing the iterator, or cancelling the optional CancelToken, cancels it at once.
+def Stream(AsyncIterable, Cancel=None):
+    Items = queue.Queue()
+
+    async def Produce():
+        Error = None
+        try:
+            async for Item in AsyncIterable:
+                Items.put((Item, None))
+        except Exception as e:
+            Error = e
+        finally:
+            Items.put((StreamEnd, Error))
+
+    Future = Submit(Produce())
+    Unregister = Cancel.OnCancel(Future.cancel) if Cancel is not None else lambda: None
+    try:
+        while True:
+            Item, Error = Items.get()
+            if Item is StreamEnd:
+                if Error is not None:
+                    raise Error
+                return
+            yield Item
+    finally:
+        Unregister()
+        Future.cancel()
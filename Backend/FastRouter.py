@@ -0,0 +1,133 @@
+from dotenv import dotenv_values  # Import dotenv to read the assistant's name and router settings.
+import re  # Import re for the compiled command patterns.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+Assistantname = str(env_vars.get("Assistantname") or "jarvis").lower()
+
+# Decisions below this confidence fall through to the Cohere model.
+FastRouteThreshold = float(env_vars.get("FastRouteThreshold", 0.9))
+
+# App and website names longer than this are more likely part of a sentence than a name.
+MaxNameWords = 4
+
+# Polite openers and wake words that do not change the intent.
+Prefix = re.compile(rf"^(?:(?:hey|hi|ok|okay)\s+)?(?:{re.escape(Assistantname)}\s*,?\s*)?(?:(?:please|can you|could you|would you|will you|kindly)\s+)*")
+
+# Polite closers that do not change the intent ("open chrome please").
+Suffix = re.compile(r"(?:\s*,?\s*(?:please|thanks|thank you))+$")
+
+# Punctuation that ends a sentence; Normalize turns it into " . " so each sentence is its own clause.
+SentenceBreak = re.compile(r"[.?!;]+(?=\s|$)")
+
+# Words that separate several commands in one utterance.
+Separator = re.compile(r"\s+\.\s+|\s*,\s*(?:and\s+)?(?:then\s+)?|\s+and\s+(?:then\s+)?")
+
+# System tasks understood by Automation.System, with the common ways of saying them.
+SystemTasks = [
+    (re.compile(r"^(?:mute)(?: the)?(?: volume| sound| audio)?$"), "mute"),
+    (re.compile(r"^(?:unmute)(?: the)?(?: volume| sound| audio)?$"), "unmute"),
+    (re.compile(r"^(?:volume up|(?:turn|increase|raise)(?: the)? volume(?: up)?|turn up(?: the)? volume)$"), "volume up"),
+    (re.compile(r"^(?:volume down|(?:turn|decrease|lower|reduce)(?: the)? volume(?: down)?|turn down(?: the)? volume)$"), "volume down"),
+]
+
+# Single-clause commands that map straight onto a decision, with the confidence of each pattern.
+Patterns = [
+    (re.compile(r"^(?:bye|goodbye|good bye|exit|quit)(?: (?:for now|then))?$"), lambda m: "exit", 1.0),
+    (re.compile(r"^(?:google search|search google for|search on google for|search google)\s+(.+)$"), lambda m: f"google search {m.group(1)}", 1.0),
+    (re.compile(r"^(?:youtube search|search youtube for|search on youtube for|search youtube)\s+(.+)$"), lambda m: f"youtube search {m.group(1)}", 1.0),
+    (re.compile(r"^generate(?: an?)? (?:image|picture|photo)s?\s+(.+)$"), lambda m: f"generate image {m.group(1)}", 1.0),
+    (re.compile(r"^create(?: an?)? (?:image|picture|photo)s?\s+((?:of|showing|depicting)\s+.+)$"), lambda m: f"generate image {m.group(1)}", 1.0),
+    (re.compile(r"^play\s+(.+?)(?: on youtube)?$"), lambda m: f"play {m.group(1)}", 0.95),
+    (re.compile(r"^(?:what(?:'s| is) the (?:time|date|day)(?: today| now| right now)?|what time is it(?: now)?|what day is (?:it|today)|what(?:'s| is) today'?s date)$"), lambda m: f"general {m.group(0)}", 0.95),
+]
+
+# Commands that take one or more app or website names.
+NamedCommand = re.compile(r"^(open|close|launch|start|quit|exit)\s+(.+)$")
+NamedVerbs = {"launch": "open", "start": "open", "quit": "close", "exit": "close"}
+
+# "start", "launch", "quit" and "exit" are often ordinary speech ("start over", "quit smoking"), so their
+# commands stay below the routing threshold and the model decides.
+SynonymConfidence = 0.8
+
+# Clause openings that start another command, so a free-text command cannot swallow the rest of the utterance.
+CommandStart = re.compile(r"^(?:open|close|launch|start|quit|exit|play|mute|unmute|volume|turn|increase|decrease|raise|lower|reduce|google|youtube|search|generate|create)\b")
+
+# Names too vague to act on without the model's help.
+VagueNames = {"it", "that", "this", "file", "the file", "them", "something", "anything"}
+
+# First words that make a name or free-text argument ordinary speech rather than a target
+# ("play with me", "play it again", "close your eyes", "google search my location").
+VagueStarts = {"it", "that", "this", "them", "me", "you", "your", "yours", "my", "our", "his", "her", "their", "with", "along", "again", "around", "something", "anything"}
+
+# Function to tell whether a name or free-text argument is too vague to act on.
+def IsVague(Text):
+    return Text in VagueNames or Text.split()[0] in VagueStarts
+
+# Function to lowercase a query and drop punctuation and filler that do not change the intent.
+def Normalize(Query):
+    Query = str(Query).lower().strip()
+    Query = SentenceBreak.sub(" . ", Query)
+    Query = re.sub(r"[?!;:\"]+", " ", Query)
+    Query = re.sub(r"\s+", " ", Query).strip()
+    return Prefix.sub("", Query).strip(" ,.")
+
+# Function to resolve one clause; returns (decisions, confidence) or None.
+def RouteClause(Clause, PreviousVerb=None):
+    Clause = Suffix.sub("", Clause)
+    for pattern, task in SystemTasks:
+        if pattern.match(Clause):
+            return [f"system {task}"], 1.0
+
+    for pattern, build, confidence in Patterns:
+        match = pattern.match(Clause)
+        if match:
+            if match.lastindex and IsVague(match.group(1)):
+                return None
+            return [build(match)], confidence
+
+    Confidence = 0.95
+    match = NamedCommand.match(Clause)
+    if match:
+        Verb = NamedVerbs.get(match.group(1), match.group(1))
+        if match.group(1) in NamedVerbs:
+            Confidence = SynonymConfidence
+        Names = [name.strip() for name in Separator.split(match.group(2)) if name.strip()]
+    elif PreviousVerb in ("open", "close") and len(Clause.split()) <= 2:
+        Verb, Names = PreviousVerb, [Clause]  # "open chrome and firefox"
+    else:
+        return None
+
+    if not Names or any(IsVague(name) for name in Names):
+        return None  # "close your eyes", "open my email and reply"
+    Names = [re.sub(r"^the\s+", "", name) for name in Names]
+    Names = [re.sub(r"\s+(?:app|application|website|browser)$", "", name) for name in Names]
+    if any(name in VagueNames or len(name.split()) > MaxNameWords for name in Names):
+        return None
+    return [f"{Verb} {name}" for name in Names], Confidence
+
+# Function to classify a query locally; returns (decisions, confidence) or None when the model should decide.
+def FastRoute(Query):
+    Text = Normalize(Query)
+    if not Text:
+        return None
+
+    # A command that takes free text (play, search, image) owns the rest of the sentence,
+    # unless another command follows it ("play despacito and open chrome").
+    Clauses = [Clause for Clause in Separator.split(Text) if Clause]
+    Whole = RouteClause(Text) if " . " not in Text else None
+    if Whole is not None and not NamedCommand.match(Text) and not any(CommandStart.match(Clause) for Clause in Clauses[1:]):
+        return Whole if Whole[1] >= FastRouteThreshold else None
+
+    Decisions, Confidence, Verb = [], 1.0, None
+    for Clause in Clauses:
+        Result = RouteClause(Clause, Verb)
+        if Result is None:
+            return None
+        Decisions += Result[0]
+        Confidence = min(Confidence, Result[1])
+        Verb = Result[0][-1].split()[0]
+
+    if not Decisions or Confidence < FastRouteThreshold:
+        return None
+    return Decisions, Confidence
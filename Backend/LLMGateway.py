@@ -0,0 +1,264 @@
+from groq import Groq, AsyncGroq  # Import the Groq clients (sync and async).
+from dotenv import dotenv_values  # Import dotenv to read keys, model aliases and timeouts.
+from collections import deque  # Import deque to keep a bounded history of call metrics.
+from time import perf_counter  # Import perf_counter to time each call.
+import threading  # Import threading to guard lazy client creation and metrics.
+import asyncio  # Import asyncio to tell a cancelled async call from a failed one.
+import cohere  # Import cohere for the decision model.
+import httpx  # Import httpx for the shared keep-alive connection pools.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+GroqAPIKey = env_vars.get("GroqAPIKey")
+CohereAPIKey = env_vars.get("CohereAPIKey")
+
+# Model aliases used by the backends, each overridable from .env.
+ModelAliases = {
+    "chat": env_vars.get("ChatModel", "llama3-70b-8192"),
+    "realtime": env_vars.get("RealtimeModel", env_vars.get("ChatModel", "llama3-70b-8192")),
+    "content": env_vars.get("ContentModel", env_vars.get("ChatModel", "llama3-70b-8192")),
+    "summary": env_vars.get("SummaryModel", env_vars.get("ChatModel", "llama3-70b-8192")),
+    "decision": env_vars.get("DecisionModel", "command-r-plus"),
+}
+
+# Timeouts (seconds) and retries applied to every call unless a call passes its own timeout.
+LLMTimeout = float(env_vars.get("LLMTimeout", 30))
+LLMConnectTimeout = float(env_vars.get("LLMConnectTimeout", 5))
+LLMMaxRetries = int(env_vars.get("LLMMaxRetries", 2))
+
+# Connection pool limits shared by all calls to a provider.
+PoolLimits = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120)
+
+Clients = {}
+ClientsLock = threading.Lock()
+
+# Per-call metrics: alias, model, latency, time to first token, tokens in and out, and whether it failed.
+Metrics = deque(maxlen=500)
+MetricsLock = threading.Lock()
+
+# Function to look up the model name behind an alias (a name that is not an alias is used as is).
+def ResolveModel(alias):
+    return ModelAliases.get(alias, alias)
+
+# Function to build the default timeout, or one for a single call.
+def MakeTimeout(seconds=None):
+    return httpx.Timeout(seconds or LLMTimeout, connect=LLMConnectTimeout)
+
+# Function to create a client once and reuse it (and its connection pool) for every later call.
+def GetClient(name):
+    with ClientsLock:
+        if name not in Clients:
+            if name == "groq":
+                Clients[name] = Groq(api_key=GroqAPIKey, max_retries=LLMMaxRetries, timeout=MakeTimeout(),
+                                     http_client=httpx.Client(limits=PoolLimits, timeout=MakeTimeout()))
+            elif name == "async-groq":
+                Clients[name] = AsyncGroq(api_key=GroqAPIKey, max_retries=LLMMaxRetries, timeout=MakeTimeout(),
+                                          http_client=httpx.AsyncClient(limits=PoolLimits, timeout=MakeTimeout()))
+            elif name == "cohere":
+                Clients[name] = cohere.Client(api_key=CohereAPIKey, timeout=LLMTimeout,
+                                              httpx_client=httpx.Client(limits=PoolLimits, timeout=MakeTimeout()))
+            elif name == "async-cohere":
+                Clients[name] = cohere.AsyncClient(api_key=CohereAPIKey, timeout=LLMTimeout,
+                                                   httpx_client=httpx.AsyncClient(limits=PoolLimits, timeout=MakeTimeout()))
+            else:
+                raise ValueError(f"Unknown LLM client: {name}")
+        return Clients[name]
+
+# Function to estimate tokens when the provider does not report usage (about four characters per token).
+def EstimateTokens(text):
+    return len(str(text)) // 4 + 1
+
+# Tracks one call from start to finish and records its metrics.
+class CallTimer:
+
+    def __init__(self, alias, prompt_text=""):
+        self.Alias = alias
+        self.Model = ResolveModel(alias)
+        self.Started = perf_counter()
+        self.FirstToken = None
+        self.InputTokens = EstimateTokens(prompt_text)
+        self.OutputTokens = None
+        self.Text = ""
+
+    def Token(self, text):
+        if self.FirstToken is None:
+            self.FirstToken = perf_counter()
+        self.Text += text
+
+    def Usage(self, usage):
+        if usage is not None:
+            self.InputTokens = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or self.InputTokens
+            self.OutputTokens = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or self.OutputTokens
+
+    def Finish(self, error=None):
+        now = perf_counter()
+        entry = {
+            "Alias": self.Alias,
+            "Model": self.Model,
+            "Seconds": now - self.Started,
+            "FirstTokenSeconds": (self.FirstToken - self.Started) if self.FirstToken else None,
+            "InputTokens": self.InputTokens,
+            "OutputTokens": self.OutputTokens or EstimateTokens(self.Text),
+            "Error": str(error) if error else None,
+        }
+        with MetricsLock:
+            Metrics.append(entry)
+        return entry
+
+# Function to pull the usage block out of a Groq stream chunk, if it has one.
+def ChunkUsage(chunk):
+    extra = getattr(chunk, "x_groq", None)
+    return getattr(extra, "usage", None) or getattr(chunk, "usage", None)
+
+# Function to join the text of a list of chat messages, for token estimates.
+def MessagesText(messages):
+    return " ".join(str(message.get("content", "")) for message in messages)
+
+# Stream a chat completion as text deltas; closing the generator closes the HTTP stream.
+# Cancelling the optional CancelToken closes the stream from any thread and ends the generator quietly.
+def StreamChat(alias, messages, timeout=None, Cancel=None, **params):
+    timer = CallTimer(alias, MessagesText(messages))
+    completion = None
+    error = None
+    unregister = lambda: None
+    try:
+        if Cancel is not None and Cancel.Cancelled:
+            return
+        completion = GetClient("groq").chat.completions.create(
+            model=ResolveModel(alias), messages=messages, stream=True, timeout=MakeTimeout(timeout), **params
+        )
+        if Cancel is not None:
+            unregister = Cancel.OnCancel(completion.close)
+        for chunk in completion:
+            if Cancel is not None and Cancel.Cancelled:
+                error = "cancelled"
+                return
+            timer.Usage(ChunkUsage(chunk))
+            if chunk.choices and chunk.choices[0].delta.content:
+                delta = chunk.choices[0].delta.content
+                timer.Token(delta)
+                yield delta
+    except Exception as e:
+        if Cancel is not None and Cancel.Cancelled:
+            error = "cancelled"
+            return  # The stream was closed under us on purpose.
+        error = e
+        raise
+    finally:
+        unregister()
+        if completion is not None:
+            completion.close()
+        timer.Finish(error)
+
+# Run a chat completion and return the whole text.
+def Chat(alias, messages, timeout=None, **params):
+    timer = CallTimer(alias, MessagesText(messages))
+    try:
+        completion = GetClient("groq").chat.completions.create(
+            model=ResolveModel(alias), messages=messages, stream=False, timeout=MakeTimeout(timeout), **params
+        )
+        text = completion.choices[0].message.content or ""
+        timer.Token(text)
+        timer.Usage(getattr(completion, "usage", None))
+        timer.Finish()
+        return text
+    except Exception as e:
+        timer.Finish(e)
+        raise
+
+# Async version of StreamChat; cancelling the task closes the stream.
+async def AStreamChat(alias, messages, timeout=None, Cancel=None, **params):
+    timer = CallTimer(alias, MessagesText(messages))
+    completion = None
+    error = None
+    try:
+        if Cancel is not None and Cancel.Cancelled:
+            return
+        completion = await GetClient("async-groq").chat.completions.create(
+            model=ResolveModel(alias), messages=messages, stream=True, timeout=MakeTimeout(timeout), **params
+        )
+        async for chunk in completion:
+            if Cancel is not None and Cancel.Cancelled:
+                error = "cancelled"
+                return
+            timer.Usage(ChunkUsage(chunk))
+            if chunk.choices and chunk.choices[0].delta.content:
+                delta = chunk.choices[0].delta.content
+                timer.Token(delta)
+                yield delta
+    except asyncio.CancelledError:
+        error = "cancelled"
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if completion is not None:
+            await completion.close()
+        timer.Finish(error)
+
+# Stream a Cohere chat reply as text pieces.
+def StreamDecision(message, alias="decision", timeout=None, **params):
+    timer = CallTimer(alias, message + str(params.get("preamble", "")))
+    error = None
+    try:
+        stream = GetClient("cohere").chat_stream(
+            model=ResolveModel(alias), message=message, request_options={"timeout_in_seconds": int(timeout or LLMTimeout)}, **params
+        )
+        for event in stream:
+            if event.event_type == "text-generation":
+                timer.Token(event.text)
+                yield event.text
+            elif event.event_type == "stream-end":
+                timer.Usage(getattr(getattr(event.response, "meta", None), "billed_units", None))
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        timer.Finish(error)
+
+# Async version of StreamDecision.
+async def AStreamDecision(message, alias="decision", timeout=None, **params):
+    timer = CallTimer(alias, message + str(params.get("preamble", "")))
+    error = None
+    try:
+        stream = GetClient("async-cohere").chat_stream(
+            model=ResolveModel(alias), message=message, request_options={"timeout_in_seconds": int(timeout or LLMTimeout)}, **params
+        )
+        async for event in stream:
+            if event.event_type == "text-generation":
+                timer.Token(event.text)
+                yield event.text
+            elif event.event_type == "stream-end":
+                timer.Usage(getattr(getattr(event.response, "meta", None), "billed_units", None))
+    except asyncio.CancelledError:
+        error = "cancelled"
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        timer.Finish(error)
+
+# Function to summarize the recorded calls per alias.
+def GetMetrics():
+    with MetricsLock:
+        entries = list(Metrics)
+    summary = {}
+    for entry in entries:
+        stats = summary.setdefault(entry["Alias"], {"Calls": 0, "Errors": 0, "Seconds": 0.0, "FirstTokenSeconds": 0.0, "InputTokens": 0, "OutputTokens": 0})
+        stats["Calls"] += 1
+        stats["Errors"] += 1 if entry["Error"] else 0
+        stats["Seconds"] += entry["Seconds"]
+        stats["FirstTokenSeconds"] += entry["FirstTokenSeconds"] or 0.0
+        stats["InputTokens"] += entry["InputTokens"] or 0
+        stats["OutputTokens"] += entry["OutputTokens"] or 0
+    for stats in summary.values():
+        stats["AverageSeconds"] = stats["Seconds"] / stats["Calls"]
+        stats["AverageFirstTokenSeconds"] = stats["FirstTokenSeconds"] / stats["Calls"]
+    return summary
+
+# Function to get the most recent call's metrics.
+def LastCall():
+    with MetricsLock:
+        return dict(Metrics[-1]) if Metrics else None
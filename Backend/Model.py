@@ -1,12 +1,17 @@
-import cohere
 from rich import print
 from dotenv import dotenv_values
+from time import perf_counter
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-env_vars = dotenv_values(".env")
-
-CohereAPIKey = env_vars.get("CohereAPIKey")
+from Backend.FastRouter import FastRoute
+from Backend.DecisionCache import DecisionCache
+from Backend.LLMGateway import AStreamDecision
+from Backend.EventLoop import RunSync
 
-co = cohere.Client(api_key=CohereAPIKey)
+env_vars = dotenv_values(".env")
 
 funcs =[
     "exit","general","realtime","open","play","generate image","system","content","google search","youtube search","reminder"
@@ -14,6 +19,12 @@ funcs =[
 
 messages =[]
 
+# Cohere is asked again when its answer still contains the "(query)" placeholder, at most this many times in total.
+MaxDecisionAttempts = int(env_vars.get("MaxDecisionAttempts", 3))
+
+# Decisions already made by Cohere, keyed on the normalized query.
+Cache = DecisionCache()
+
 
 preamble = """
 You are a very accurate Decision-Making Model, which decides what kind of a query is given to you.
@@ -50,13 +61,25 @@ ChatHistory = [
     {   "role":"Chatbot","message":"general chat with me."} 
 ]
 
-def FirstLayerDMM(prompt: str ="test"):
+# Which path made the last decision ("local", "cache" or "cohere"), how confident it was and how long it took.
+LastRoute = {"Path": None, "Confidence": None, "Seconds": None}
+
+# Number of decisions made by each path.
+RouteStats = {"local": 0, "cache": 0, "cohere": 0}
+
+def RecordRoute(path, confidence, started):
+    LastRoute.update(Path=path, Confidence=confidence, Seconds=perf_counter() - started)
+    RouteStats[path] += 1
+
+def GetLastRoute():
+    return dict(LastRoute)
+
+async def CohereDecision(prompt):
 
     messages.append({"role":"user","content": f"{prompt}"})
 
-    stream = co.chat_stream(
-        model='command-r-plus',
-        message=prompt,
+    stream = AStreamDecision(
+        prompt,
         temperature=0.7,
         chat_history=ChatHistory,
         prompt_truncation='OFF',
@@ -65,9 +88,8 @@ def FirstLayerDMM(prompt: str ="test"):
     )
     
     response = ""
-    for event in stream:
-        if event.event_type =="text-generation":
-            response += event.text
+    async for text in stream:
+        response += text
 
     response =response.replace("\n","")
     response =response.split(",")
@@ -81,16 +103,46 @@ def FirstLayerDMM(prompt: str ="test"):
             if task.startswith(func):
                 temp.append(task)
 
-    response = temp
+    return temp
+
+# Whether deciding this prompt needs a Cohere round trip (no local route and no cached decision).
+def NeedsCohere(prompt):
+    return FastRoute(prompt) is None and not Cache.Contains(prompt)
+
+# Function to decide what kind of query a prompt is, on the shared event loop.
+async def AFirstLayerDMM(prompt: str ="test"):
+
+    started = perf_counter()
+
+    # Resolve obvious commands locally, without a network call.
+    fast = FastRoute(prompt)
+    if fast is not None:
+        RecordRoute("local", fast[1], started)
+        return fast[0]
 
-    if any("(query)" in r for r in response):
-        return FirstLayerDMM(prompt=prompt)
+    # Reuse the decision for a query that was classified before.
+    cached = Cache.Get(prompt)
+    if cached is not None:
+        RecordRoute("cache", None, started)
+        return cached
+
+    for attempt in range(MaxDecisionAttempts):
+        response = await CohereDecision(prompt)
+        if response and not any("(query)" in r for r in response):
+            await asyncio.to_thread(Cache.Put, prompt, response)  # Saving the cache file must not hold up the loop.
+            break
     else:
-        return response
+        # Still a placeholder after every attempt: keep what is usable and treat the rest as a general query.
+        response = [r for r in response if "(query)" not in r] or [f"general {prompt}"]
 
-    
+    RecordRoute("cohere", None, started)
+    return response
+
+# Blocking wrapper around AFirstLayerDMM for the pipeline threads and the REPL.
+def FirstLayerDMM(prompt: str ="test"):
+    return RunSync(AFirstLayerDMM(prompt))
 
 if __name__ =="__main__":
 
     while True:
-        print(FirstLayerDMM(input(">>>")))
\ No newline at end of file
+        print(FirstLayerDMM(input(">>>")), GetLastRoute(), Cache.Stats())
\ No newline at end of file
@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor  # Import a worker pool for HTML text extraction.
+from dotenv import dotenv_values  # Import dotenv to read the fetch settings.
+from bs4 import BeautifulSoup  # Import BeautifulSoup to pull the main text out of a page.
+from time import perf_counter  # Import perf_counter to time each batch.
+import asyncio  # Import asyncio to fetch pages concurrently.
+import httpx  # Import httpx for the pooled async HTTP client.
+import re  # Import re to clean up extracted text.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.EventLoop import Submit  # Import the shared event loop the pages are fetched on.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Number of top results whose pages are fetched (0 turns page fetching off).
+PageFetchCount = int(env_vars.get("PageFetchCount", 3))
+
+# Hard limit (seconds) for the whole batch; pages that are not extracted by then are dropped.
+PageFetchDeadline = float(env_vars.get("PageFetchDeadline", 2.5))
+
+# Most characters of extracted text kept per page, and the size of one passage.
+PageTextChars = int(env_vars.get("PageTextChars", 20000))
+PassageChars = int(env_vars.get("PassageChars", 600))
+
+# Pages larger than this are cut off, since the main text is almost always near the top.
+PageMaxBytes = 1_500_000
+
+# Sent with every request so sites serve their normal desktop page.
+Headers = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# Tags that never hold the main text of a page.
+NoiseTags = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button"]
+
+# Workers for HTML parsing, so a slow page never blocks the fetches.
+ExtractPool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="PageExtract")
+
+# The fetcher keeps one HTTP client alive on the shared event loop, so connections are reused between turns.
+Client = None
+
+# Totals across batches.
+FetchStats = {"Batches": 0, "Requested": 0, "Extracted": 0, "Failed": 0, "Dropped": 0, "Seconds": 0.0}
+
+# Function to get the pooled HTTP client; only called on the shared loop.
+def GetClient():
+    global Client
+    if Client is None:
+        Client = httpx.AsyncClient(
+            headers=Headers,
+            follow_redirects=True,
+            timeout=httpx.Timeout(PageFetchDeadline, connect=min(PageFetchDeadline, 2.0)),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60),
+        )
+    return Client
+
+# Function to pull the readable text out of an HTML page.
+def ExtractText(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NoiseTags):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    blocks = []
+    for tag in root.find_all(["h1", "h2", "h3", "p", "li", "td"]):
+        text = re.sub(r"\s+", " ", tag.get_text(" ", strip=True))
+        if len(text) >= 40 or (tag.name.startswith("h") and text):
+            blocks.append(text)
+    return "\n".join(blocks)[:PageTextChars]
+
+# Function to split page text into passages of about PassageChars characters along line breaks.
+def SplitPassages(text, size=PassageChars):
+    passages, current = [], ""
+    for line in text.split("\n"):
+        if current and len(current) + len(line) > size:
+            passages.append(current)
+            current = ""
+        current = f"{current} {line}".strip()
+        while len(current) > size * 2:
+            passages.append(current[:size])
+            current = current[size:]
+    if current:
+        passages.append(current)
+    return passages
+
+async def _FetchOne(url):
+    async with GetClient().stream("GET", url) as response:
+        response.raise_for_status()
+        if "html" not in response.headers.get("content-type", "html"):
+            return ""
+        body = b""
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) >= PageMaxBytes:
+                break
+        html = body.decode(response.encoding or "utf-8", errors="replace")
+    return await asyncio.get_running_loop().run_in_executor(ExtractPool, ExtractText, html)
+
+# Fetch and extract several pages at once; returns {url: text} for the pages finished before the deadline.
+async def AFetchPages(urls, deadline=PageFetchDeadline):
+    started = perf_counter()
+    tasks = {asyncio.ensure_future(_FetchOne(url)): url for url in urls}
+    done, pending = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+
+    pages = {}
+    failed = 0
+    for task in done:
+        if task.exception() is not None:
+            failed += 1
+        elif task.result():
+            pages[tasks[task]] = task.result()
+
+    FetchStats["Batches"] += 1
+    FetchStats["Requested"] += len(urls)
+    FetchStats["Extracted"] += len(pages)
+    FetchStats["Failed"] += failed
+    FetchStats["Dropped"] += len(pending)
+    FetchStats["Seconds"] += perf_counter() - started
+    return pages
+
+# Blocking wrapper around AFetchPages for the synchronous backends.
+def FetchPages(urls, deadline=PageFetchDeadline):
+    urls = [url for url in urls if url and url.startswith("http")]
+    if not urls:
+        return {}
+    future = Submit(AFetchPages(urls, deadline))
+    try:
+        return future.result(timeout=deadline + 1)
+    except Exception as e:
+        future.cancel()
+        print(f"Error fetching pages: {e}")
+        return {}
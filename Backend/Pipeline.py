@@ -0,0 +1,146 @@
+from dotenv import dotenv_values  # Import dotenv to read the queue size.
+from time import perf_counter, sleep  # Import perf_counter to measure how busy each stage is.
+import threading  # Import threading for the stage workers and their lock.
+import inspect  # Import inspect to tell stages that yield several items from ones that return one.
+import queue  # Import queue for the bounded queues between stages.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Most items waiting between two stages; a full queue makes the stage before it wait.
+PipelineQueueSize = int(env_vars.get("PipelineQueueSize", 2))
+
+# Pause (seconds) after a source stage fails, so a persistent error does not spin.
+ErrorPause = 0.5
+
+# One step of a pipeline, run by its own worker thread. Work gets each item from the input queue and returns
+# the item for the next stage, None to drop it, or yields several items, each passed on as soon as it is yielded.
+# A stage without an input queue is a source: Work is called over and over with no argument.
+class Stage:
+
+    def __init__(self, Name, Work, Input=None, Output=None, Skip=None, Discard=None):
+        self.Name = Name
+        self.Work = Work
+        self.Input = Input
+        self.Output = Output
+        self.Skip = Skip          # Items for which Skip returns True are dropped without running Work.
+        self.Discard = Discard    # Called with every input item that is skipped, or whose Work fails before passing anything on.
+        self.Thread = None
+        self.Lock = threading.Lock()
+        self.Started = None
+        self.BusySince = None     # When the item in hand was taken, or None while waiting.
+        self.BusySeconds = 0.0
+        self.BlockedSeconds = 0.0  # Time spent waiting for room in the output queue.
+        self.Items = 0
+        self.Skipped = 0
+        self.Errors = 0
+
+    # Start the worker thread, once.
+    def Start(self):
+        if self.Thread is None:
+            self.Started = perf_counter()
+            self.Thread = threading.Thread(target=self._Run, name=f"Stage-{self.Name}", daemon=True)
+            self.Thread.start()
+
+    # Return the stage counters: items handled, input queue depth and the fraction of time spent working.
+    def Stats(self):
+        with self.Lock:
+            now = perf_counter()
+            busy = self.BusySeconds + (now - self.BusySince if self.BusySince is not None else 0.0)
+            elapsed = now - self.Started if self.Started is not None else 0.0
+            return {
+                "Items": self.Items,
+                "Skipped": self.Skipped,
+                "Errors": self.Errors,
+                "Queue": self.Input.qsize() if self.Input is not None else 0,
+                "Busy": self.BusySince is not None,
+                "Occupancy": busy / elapsed if elapsed else 0.0,
+                "BlockedSeconds": self.BlockedSeconds,
+            }
+
+    def _Run(self):
+        while True:
+            Item = self.Input.get() if self.Input is not None else None
+            if self.Input is not None and self.Skip is not None and self.Skip(Item):
+                with self.Lock:
+                    self.Skipped += 1
+                self._Discard(Item)
+                continue
+
+            with self.Lock:
+                self.BusySince = perf_counter()
+            Passed = False
+            try:
+                Result = self.Work(Item) if self.Input is not None else self.Work()
+                if inspect.isgenerator(Result):
+                    for Produced in Result:
+                        Passed = self._Put(Produced) or Passed
+                else:
+                    Passed = self._Put(Result)
+                with self.Lock:
+                    self.Items += 1
+            except Exception as e:
+                print(f"Error in {self.Name} stage: {e}")
+                with self.Lock:
+                    self.Errors += 1
+                if self.Input is None:
+                    sleep(ErrorPause)
+                elif not Passed:
+                    self._Discard(Item)
+            finally:
+                with self.Lock:
+                    self.BusySeconds += perf_counter() - self.BusySince
+                    self.BusySince = None
+
+    # Hand an item to the next stage and return whether it was passed on; the wait for room does not count as busy.
+    def _Put(self, Item):
+        if Item is None or self.Output is None:
+            return False
+        Waiting = perf_counter()
+        self.Output.put(Item)
+        with self.Lock:
+            Blocked = perf_counter() - Waiting
+            self.BlockedSeconds += Blocked
+            self.BusySince += Blocked
+        return True
+
+    def _Discard(self, Item):
+        if self.Discard is not None:
+            try:
+                self.Discard(Item)
+            except Exception as e:
+                print(f"Error discarding item in {self.Name} stage: {e}")
+
+# A chain of stages joined by bounded queues, so each stage works on the next item while the later ones
+# are still busy with earlier items.
+class Pipeline:
+
+    def __init__(self, QueueSize=PipelineQueueSize, Skip=None, Discard=None):
+        self.QueueSize = QueueSize
+        self.Skip = Skip
+        self.Discard = Discard
+        self.Stages = []
+
+    # Add a stage after the last one; the first stage added is the source.
+    def Add(self, Name, Work, QueueSize=None):
+        Input = None
+        if self.Stages:
+            Input = queue.Queue(maxsize=QueueSize or self.QueueSize)
+            self.Stages[-1].Output = Input
+        Added = Stage(Name, Work, Input, Skip=self.Skip, Discard=self.Discard)
+        self.Stages.append(Added)
+        return Added
+
+    # Start every stage.
+    def Start(self):
+        for Worker in self.Stages:
+            Worker.Start()
+        return self
+
+    # Return the number of items waiting in front of each stage.
+    def Depths(self):
+        return {Worker.Name: Worker.Input.qsize() for Worker in self.Stages if Worker.Input is not None}
+
+    # Return the counters of every stage, in pipeline order.
+    def Stats(self):
+        return {Worker.Name: Worker.Stats() for Worker in self.Stages}
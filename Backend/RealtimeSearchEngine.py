@@ -1,8 +1,17 @@
 from googlesearch import search
-from groq import Groq  # Importing the Groq library to use its API.
-from json import load, dump  # Importing functions to read and write JSON files.
 import datetime  # Importing the datetime module for real-time date and time information.
 from dotenv import dotenv_values  # Importing dotenv_values to read .env file
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.ChatStore import GetChatStore  # Importing the shared append-only chat log.
+from Backend.LLMGateway import AStreamChat  # Importing the shared, pooled LLM client layer.
+from Backend.EventLoop import RunSync, Stream  # Importing the shared event loop the requests run on.
+from Backend.SearchCache import SearchCache  # Importing the TTL cache for search results.
+from Backend.PageFetcher import FetchPages, SplitPassages, PageFetchCount  # Importing the concurrent page fetcher.
+from Backend.ContextPacker import PackPassages  # Importing the token-budgeted passage ranker.
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values('.env')
@@ -10,10 +19,6 @@ env_vars = dotenv_values('.env')
 # Retrieve environment variables for the chatbot configuration.
 Username = env_vars.get('Username')
 Assistantname = env_vars.get('Assistantname')
-GroqAPIKey = env_vars.get('GroqAPIKey')
-
-# Initialize the Groq Client with the provided API key.
-Client = Groq(api_key=GroqAPIKey)
 
 # Define the system instructions for the chatbot.
 
@@ -21,22 +26,38 @@ System = f"""Hello, I am {Username}, You are a very accurate and advanced AI cha
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-# Try to load the chat log from a JSON file, or create an empty one
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
+# Open the shared chat log (migrating the old ChatLog.json on first run).
+GetChatStore()
+
+# Function to fetch the top Google results for a query as plain dictionaries,
+# with the main text of the first few pages fetched side by side.
+def FetchSearchResults(query):
+    results = [
+        {"title": i.title, "description": i.description, "url": i.url, "content": ""}
+        for i in search(query, advanced=True, num_results=5)
+    ]
+    Pages = FetchPages([i["url"] for i in results[:PageFetchCount]]) if PageFetchCount > 0 else {}
+    for i in results:
+        i["content"] = Pages.get(i["url"], "")
+    return results
+
+# Cache of search results, so repeated and follow-up questions do not hit Google every time.
+Searches = SearchCache(FetchSearchResults)
 
 # Function to perform a Google search and format the results.
 def GoogleSearch(query):
-    results = list(search(query, advanced=True, num_results=5))
+    results = Searches.Get(query)
     Answer = f"The search results for '{query}' are:\n[Start]\n"
     # RealtimeSearchEngine.py
 
+    # Rank the descriptions and page passages against the query and keep the best ones that fit the budget.
+    Passages = []
     for i in results:
-        Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
+        Passages.append((i['title'], i['description']))
+        Passages += [(i['title'], Passage) for Passage in SplitPassages(i.get("content", ""))]
+
+    for Title, Text in PackPassages(query, Passages):
+        Answer += f"Title: {Title}\nContent: {Text}\n\n"
 
     Answer += "[end]"
     return Answer
@@ -49,11 +70,12 @@ def AnswerModifier(Answer):
     return modified_answer
 
 # Predefined chatbot conversation system message and an initial user message.
-SystemChatBot = [
-    {"role": "system", "content": "System"},
+# Shared by every call and never modified; each request builds its own message list on top of it.
+SystemChatBot = (
+    {"role": "system", "content": System},
     {"role": "user", "content": "Hi"},
     {"role": "assistant", "content": "Hello, how can I help you?"}
-]
+)
 
 # Function to get real-time information like the current date and time.
 def Information():
@@ -75,47 +97,76 @@ def Information():
     data += f"Time: {hour} hours {minute} minutes {second} seconds.\n"
     return data
 
-def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-
-# Load the chat log from the JSON file.
-    with open("Data\\ChatLog.json", "r") as f:
-        messages = load(f)
-    messages.append({"role": "user", "content": f"{prompt}"})
-
-# Add Google search results to the system chatbot messages.
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
-
-# Generate a response using the Grog Client.
-    completion = Client.chat.completions.create(
-        model="llama3-70b-8192",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
-        temperature=0.7,
-        max_tokens=2048,
-        top_p=1,
-        stream=True,
-        stop=None
-)
-
-    Answer = ""
-
-# Concatenate response chunks from the streaming output.
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
+# Realtime requests allowed to run at the same time (searches, page fetches and model calls included).
+RealtimeConcurrency = int(env_vars.get('RealtimeConcurrency', 3))
+
+# Realtime search engine: every call keeps its own request state, so several calls can run side by side.
+class RealtimeSearch:
+
+    def __init__(self, MaxConcurrent=RealtimeConcurrency):
+        self.MaxConcurrent = MaxConcurrent
+        self.Slots = None  # Created on the event loop the first time it is needed.
+
+    # Build the message list for one request from the shared system prompt, the search results and the chat log.
+    def BuildRequest(self, prompt, SearchResults):
+        history = GetChatStore().Messages()
+        return (
+            list(SystemChatBot)
+            + [{"role": "system", "content": SearchResults}, {"role": "system", "content": Information()}]
+            + history
+            + [{"role": "user", "content": f"{prompt}"}]
+        )
+
+    # Streaming entry point that yields the answer as text deltas while it is generated, on the shared event loop.
+    # SearchResults may carry GoogleSearch(prompt) fetched ahead of time; Cancel may carry a CancelToken.
+    async def AStream(self, prompt, SearchResults=None, Cancel=None):
+        if self.Slots is None:
+            self.Slots = asyncio.Semaphore(self.MaxConcurrent)
+        async with self.Slots:
+            request = self.BuildRequest(prompt, SearchResults or await asyncio.to_thread(GoogleSearch, prompt))
+            Answer = ""
+
+# Hand each piece of the response to the caller as soon as it arrives.
+            async for Delta in AStreamChat("realtime", request, temperature=0.7, max_tokens=2048, top_p=1, stop=None, Cancel=Cancel):
+                Delta = self._Clean(Delta, Answer)
+                if Delta:
+                    Answer += Delta
+                    yield Delta
+
+# Append the query and answer to the chat log off the event loop, unless the answer was interrupted.
+            if not (Cancel is not None and Cancel.Cancelled):
+                await asyncio.to_thread(GetChatStore().AppendTurn, prompt, Answer.strip())
+
+    # Streaming entry point for threads: the same stream, handed over from the event loop as it arrives.
+    def Stream(self, prompt, SearchResults=None, Cancel=None):
+        return Stream(self.AStream(prompt, SearchResults, Cancel), Cancel)
+
+    # Return the whole cleaned-up answer.
+    def Answer(self, prompt, SearchResults=None):
+        return RunSync(self.AAnswer(prompt, SearchResults))
+
+    # Async version of Answer.
+    async def AAnswer(self, prompt, SearchResults=None):
+        return AnswerModifier("".join([Delta async for Delta in self.AStream(prompt, SearchResults)]))
+
+    @staticmethod
+    def _Clean(Delta, Answer):
+        Delta = (Delta or "").replace("</s>", "")
+        return Delta if Answer else Delta.lstrip()
+
+# The engine shared by the whole assistant.
+Engine = RealtimeSearch()
+
+# Streaming search engine function that yields the answer as text deltas while it is generated.
+def RealtimeSearchEngineStream(prompt, SearchResults=None, Cancel=None):
+    return Engine.Stream(prompt, SearchResults, Cancel)
 
-# Clean up the response.
-    Answer = Answer.strip().replace("</s>", "")
-    messages.append({"role": "assistant", "content": Answer})
-
-# Save the updated chat log back to the JSON file.
-    with open("Data\\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
-
-# Remove the most recent system message from the chatbot conversation.
-    SystemChatBot.pop()
+def RealtimeSearchEngine(prompt):
+    return Engine.Answer(prompt)
 
-    return AnswerModifier(Answer=Answer)
+# Async version of RealtimeSearchEngine.
+async def ARealtimeSearchEngine(prompt):
+    return await Engine.AAnswer(prompt)
 
 # Main entry point of the program for interactive querying.
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor  # Import a small pool for background refreshes.
+from collections import OrderedDict  # Import OrderedDict for least-recently-used ordering.
+from dotenv import dotenv_values  # Import dotenv to read the cache settings.
+from time import time  # Import time for entry ages.
+import threading  # Import threading so the cache can be shared between threads.
+import re  # Import re to classify queries.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.DecisionCache import NormalizeQuery
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Cache settings: number of queries kept and how long results stay fresh for each class of query (seconds).
+SearchCacheSize = int(env_vars.get("SearchCacheSize", 256))
+SearchTTL = {
+    "news": float(env_vars.get("SearchNewsTTL", 10 * 60)),
+    "general": float(env_vars.get("SearchGeneralTTL", 6 * 3600)),
+    "reference": float(env_vars.get("SearchReferenceTTL", 7 * 24 * 3600)),
+}
+
+# Results older than their TTL but younger than TTL times this factor are served at once while a refresh runs,
+# but never more than SearchMaxStale seconds past their TTL.
+SearchStaleFactor = float(env_vars.get("SearchStaleFactor", 3))
+SearchMaxStale = float(env_vars.get("SearchMaxStale", 24 * 3600))
+
+# Words that mark a query whose answer changes within minutes or hours.
+NewsWords = re.compile(r"\b(?:news|headlines?|today|tonight|yesterday|tomorrow|latest|current|currently|now|live|weather|forecast|temperature|score|scores|match|stocks?|share price|price|rate|rates|trending|update|updates|this week|breaking)\b")
+
+# Phrasings that ask for definitions, history or biographies, which rarely change. Plain "who is" and
+# "where is" questions ("who is the ceo of twitter", "where is the nearest hospital") stay "general".
+ReferenceWords = re.compile(r"^(?:what (?:is|was|are|were) (?:a |an |the )?(?:meaning|definition|history)|define|meaning of|history of|biography of|when (?:was|did)|how (?:does|do) .+ work)\b|\b(?:born|founded|invented|discovered|biography|wikipedia)\b")
+
+# Function to sort a query into a TTL class: "news", "reference" or "general".
+def QueryClass(Query):
+    Query = NormalizeQuery(Query)
+    if NewsWords.search(Query):
+        return "news"
+    if ReferenceWords.search(Query):
+        return "reference"
+    return "general"
+
+# Bounded LRU cache of search results with a TTL per query class and stale-while-revalidate refreshes.
+class SearchCache:
+
+    def __init__(self, Fetch, MaxSize=SearchCacheSize, TTL=SearchTTL, StaleFactor=SearchStaleFactor, MaxStale=SearchMaxStale):
+        self.Fetch = Fetch  # Callable(query) -> results.
+        self.MaxSize = MaxSize
+        self.TTL = dict(TTL)
+        self.StaleFactor = StaleFactor
+        self.MaxStale = MaxStale
+        self._entries = OrderedDict()  # key -> (results, stored_at, query_class)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="SearchRefresh")
+        self.Hits = 0
+        self.StaleHits = 0
+        self.Misses = 0
+        self.Refreshes = 0
+        self.RefreshErrors = 0
+        self.Evictions = 0
+
+    # Return results for a query: fresh from the cache, stale while a refresh runs, or fetched now.
+    def Get(self, Query):
+        key = NormalizeQuery(Query)
+        Class = QueryClass(Query)
+        TTL = self.TTL.get(Class, self.TTL["general"])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                results, stored_at, _ = entry
+                age = time() - stored_at
+                if age <= TTL:
+                    self._entries.move_to_end(key)
+                    self.Hits += 1
+                    return results
+                if age <= min(TTL * self.StaleFactor, TTL + self.MaxStale):
+                    self._entries.move_to_end(key)
+                    self.StaleHits += 1
+                    self._StartRefresh(key, Query, Class)
+                    return results
+                del self._entries[key]
+            self.Misses += 1
+
+        results = self.Fetch(Query)
+        self._Store(key, results, Class)
+        return results
+
+    # Forget every cached result.
+    def Clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Return the hit/miss counters.
+    def Stats(self):
+        with self._lock:
+            lookups = self.Hits + self.StaleHits + self.Misses
+            return {
+                "Size": len(self._entries),
+                "Hits": self.Hits,
+                "StaleHits": self.StaleHits,
+                "Misses": self.Misses,
+                "HitRate": (self.Hits + self.StaleHits) / lookups if lookups else 0.0,
+                "Refreshes": self.Refreshes,
+                "RefreshErrors": self.RefreshErrors,
+                "Evictions": self.Evictions,
+            }
+
+    def _Store(self, key, results, Class):
+        if not key or not results:
+            return
+        with self._lock:
+            self._entries[key] = (results, time(), Class)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MaxSize:
+                self._entries.popitem(last=False)
+                self.Evictions += 1
+
+    # Called with the lock held; starts at most one refresh per key.
+    def _StartRefresh(self, key, Query, Class):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self._executor.submit(self._Refresh, key, Query, Class)
+
+    def _Refresh(self, key, Query, Class):
+        try:
+            results = self.Fetch(Query)
+            self._Store(key, results, Class)
+            with self._lock:
+                self.Refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.RefreshErrors += 1
+            print(f"Error refreshing search results: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
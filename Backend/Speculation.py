@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor  # Import a small pool for the speculative search fetch.
+from dotenv import dotenv_values  # Import dotenv to read the speculation mode.
+from time import perf_counter  # Import perf_counter to measure time saved and wasted.
+import threading  # Import threading for the background answer stream.
+import queue  # Import queue to buffer answer deltas until they are adopted.
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.Chatbot import ChatBotStream
+from Backend.RealtimeSearchEngine import GoogleSearch
+from Backend.ChatStore import GetChatStore
+from Backend.DecisionCache import NormalizeQuery
+from Backend.Cancellation import CancelToken
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# What to start while FirstLayerDMM is deciding: "off", "general", "search" or "both".
+SpeculativeMode = str(env_vars.get("SpeculativeMode", "off")).lower()
+
+# Threads for speculative search fetches.
+Executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Speculation")
+
+# Totals across turns: work kept, work thrown away, and the time each accounted for.
+SpeculationStats = {"Turns": 0, "Kept": 0, "Cancelled": 0, "SavedSeconds": 0.0, "WastedSeconds": 0.0}
+
+# Runs a delta generator on its own thread, buffering its output until someone reads it or it is cancelled.
+# Cancel is the CancelToken the generator was started with, so cancelling ends its request at once.
+class BackgroundStream:
+
+    def __init__(self, Generator, Cancel=None):
+        self.Queue = queue.Queue()
+        self.Token = Cancel
+        self.Text = ""
+        self.Completed = False  # True once the generator ran to the end without being cancelled.
+        self.Started = perf_counter()
+        self.Finished = None
+        self._cancel = threading.Event()
+        self.Thread = threading.Thread(target=self._Run, args=(Generator,), daemon=True)
+        self.Thread.start()
+
+    def _Run(self, Generator):
+        try:
+            for Delta in Generator:
+                if self._cancel.is_set():
+                    break
+                self.Text += Delta
+                self.Queue.put(Delta)
+            else:
+                self.Completed = True
+        except Exception as e:
+            print(f"Error in background stream: {e}")
+        finally:
+            Generator.close()  # Stops the underlying API stream if it is still open.
+            self.Finished = perf_counter()
+            self.Queue.put(None)
+
+    # Stop the stream; with a token the request is closed at once instead of after the next delta.
+    def Cancel(self):
+        self._cancel.set()
+        if self.Token is not None:
+            self.Token.Cancel("speculation")
+
+    # Seconds spent so far (or in total, once finished).
+    def Elapsed(self):
+        return (self.Finished or perf_counter()) - self.Started
+
+    # Yield everything buffered so far, then the rest as it arrives.
+    def Deltas(self):
+        while True:
+            Delta = self.Queue.get()
+            if Delta is None:
+                return
+            yield Delta
+
+# Starts the likely answer path for a query while the router is still deciding, then keeps or drops it.
+class Speculation:
+
+    def __init__(self, Query, Mode=SpeculativeMode, Cancel=None):
+        self.Query = Query
+        self.Cancel = Cancel
+        self.Key = NormalizeQuery(Query)
+        self.Started = perf_counter()
+        self.General = None
+        if Mode in ("general", "both"):
+            # Its own token, so a rejected guess can be dropped without cancelling the turn; cancelling the turn cancels it too.
+            Token = CancelToken()
+            if Cancel is not None:
+                Cancel.OnCancel(lambda: Token.Cancel(Cancel.Reason))
+            self.General = BackgroundStream(ChatBotStream(Query, Record=False, Cancel=Token), Token)
+        self.Search = Executor.submit(GoogleSearch, Query) if Mode in ("search", "both") else None
+        self.KeepGeneral = False
+        self.KeepSearch = False
+
+    # Compare the decision with what was started; cancel what is not needed and report the outcome.
+    def Resolve(self, Decision):
+        Elapsed = perf_counter() - self.Started
+        General = [" ".join(d.split()[1:]) for d in Decision if d.startswith("general")]
+        Realtime = [" ".join(d.split()[1:]) for d in Decision if d.startswith("realtime")]
+
+        self.KeepGeneral = self.General is not None and any(NormalizeQuery(q) == self.Key for q in General)
+        self.KeepSearch = self.Search is not None and any(NormalizeQuery(q) == self.Key for q in Realtime)
+
+        Report = []
+        SpeculationStats["Turns"] += 1
+        for Name, Work, Keep in (("general answer", self.General, self.KeepGeneral), ("search", self.Search, self.KeepSearch)):
+            if Work is None:
+                continue
+            if Keep:
+                Saved = min(Elapsed, Work.Elapsed()) if Name == "general answer" else Elapsed
+                SpeculationStats["Kept"] += 1
+                SpeculationStats["SavedSeconds"] += Saved
+                Report.append(f"kept {Name} (saved {Saved:.2f} s)")
+            else:
+                if Name == "search":
+                    Work.cancel()
+                    Wasted = Elapsed if not Work.cancelled() else 0.0
+                else:
+                    Work.Cancel()
+                    Wasted = Work.Elapsed()
+                SpeculationStats["Cancelled"] += 1
+                SpeculationStats["WastedSeconds"] += Wasted
+                Report.append(f"cancelled {Name} (wasted {Wasted:.2f} s)")
+
+        print("Speculation :", ", ".join(Report))
+
+    # Return the speculative answer stream for this general query if it was kept, else None.
+    def GeneralAnswer(self, QueryFinal):
+        if not self.KeepGeneral or NormalizeQuery(QueryFinal) != self.Key:
+            return None
+        self.KeepGeneral = False  # Only adopt it once.
+
+        def Adopted():
+            yield from self.General.Deltas()
+            if self.General.Completed:
+                GetChatStore().AppendTurn(self.Query, self.General.Text)
+            elif not self.General.Text:
+                yield from ChatBotStream(QueryFinal, Cancel=self.Cancel)  # The speculative call failed; answer the normal way.
+
+        return Adopted()
+
+    # Return the prefetched search results for this realtime prompt if they were kept, else None.
+    def SearchResults(self, prompt):
+        if not self.KeepSearch or NormalizeQuery(prompt) != self.Key:
+            return None
+        try:
+            return self.Search.result()
+        except Exception as e:
+            print(f"Error in speculative search: {e}")
+            return None
@@ -0,0 +1,545 @@
+from dotenv import dotenv_values  # Import dotenv to read the engine settings.
+from time import perf_counter  # Import perf_counter for timeouts and the microphone clock.
+from json import loads  # Import loads to read the local recognizer's results.
+import concurrent.futures  # Import concurrent.futures for the browser engine's wait thread.
+import threading  # Import threading for the local engine's decoding thread.
+import queue  # Import queue to hand finished utterances to the caller.
+import wave  # Import wave to read recorded audio files.
+import os  # Import os for file paths.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Get the input language setting from the environment variables.
+InputLanguage = env_vars.get("InputLanguage")
+
+# Which engine turns speech into text: "chrome" (browser speech service) or "vosk" (local, offline, CPU).
+SpeechEngineName = str(env_vars.get("SpeechEngine", "chrome")).lower()
+
+# Optional recorded WAV file used instead of the microphone (for tests and benchmarks).
+SpeechInputFile = env_vars.get("SpeechInputFile") or None
+
+# Folder of the Vosk model to load; without it Vosk downloads a small model for InputLanguage.
+VoskModelPath = env_vars.get("VoskModelPath") or None
+
+# Vosk names its models after its own language ids, which differ from the browser codes InputLanguage uses.
+VoskLanguages = {"en": "en-us", "zh": "cn", "el": "gr", "vi": "vn", "tl": "tl-ph", "kk": "kz"}
+VoskRegionalLanguages = ("en-us", "en-in", "tl-ph")
+
+# Function to turn a browser language code ("en", "en-US", "hi-IN") into a Vosk model language ("en-us", "hi").
+def VoskLanguage(Language):
+    Code = str(Language or "en").lower().replace("_", "-")
+    if Code in VoskRegionalLanguages:
+        return Code
+    Base = Code.split("-")[0]
+    return VoskLanguages.get(Base, Base)
+
+# Seconds one wait for a result may block inside the browser before it is re-armed.
+SpeechWaitTimeout = float(env_vars.get("SpeechWaitTimeout", 30))
+
+# Endpointing: trailing silence (seconds) that ends an utterance, and the longest utterance allowed.
+SpeechSilenceTimeout = float(env_vars.get("SpeechSilenceTimeout", 0.8))
+SpeechMaxUtterance = float(env_vars.get("SpeechMaxUtterance", 15))
+
+# Define the HTML code for the browser engine's speech recognition page.
+HtmlCode = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <title>Speech Recognition</title>
+</head>
+<body>
+    <button id="start" onclick="startRecognition()">Start Recognition</button>
+    <button id="end" onclick="stopRecognition()">Stop Recognition</button>
+    <p id="output"></p>
+    <script>
+        const output = document.getElementById('output');
+        const silenceTimeout = 800;  // Trailing silence (ms) that ends an utterance.
+        const maxUtterance = 15000;  // Longest utterance (ms) before it is cut.
+        let recognition;
+        let running = false;
+        let utterances = [];
+        let nextId = 1;
+        let waiting = null;
+
+        // The utterance being heard: finished segments, the current guess, and its timing.
+        let finalText = "";
+        let interimText = "";
+        let speechStart = null;
+        let speechEnd = null;
+        let consumedIndex = -1;  // Final results up to here already went into a finished utterance.
+        let carried = {};  // Interim results an utterance ended on: index -> words already handed out.
+        let interimParts = [];  // Interim results of the last event: [index, new words].
+        let silenceTimer = null;
+
+        // Hands the first utterance after afterId to callback, at once if one is queued (used by execute_async_script).
+        // Utterances stay queued until a later call passes their id, so one delivered to a wait that already
+        // timed out is handed out again instead of being lost.
+        function nextUtterance(afterId, callback) {
+            utterances = utterances.filter(function(utterance) { return utterance.id > afterId; });
+            if (utterances.length) {
+                callback(utterances[0]);
+            } else {
+                waiting = callback;
+            }
+        }
+
+        // Drops every queued utterance and returns how many there were.
+        function flushUtterances() {
+            const count = utterances.length;
+            utterances = [];
+            output.textContent = "";
+            return count;
+        }
+
+        function pushUtterance(utterance) {
+            utterance.id = nextId++;
+            output.textContent = utterance.text;
+            utterances.push(utterance);
+            if (waiting) {
+                const callback = waiting;
+                waiting = null;
+                callback(utterance);
+            }
+        }
+
+        // Drops the words of a result that an earlier utterance already used; Chrome keeps extending
+        // an interim result while the user talks on, and later makes it final with the same index.
+        function newWords(index, transcript) {
+            const words = transcript.trim().split(/\s+/).filter(Boolean);
+            return words.slice(carried[index] || 0).join(" ");
+        }
+
+        // Ends the current utterance; "reason" is "silence", "max" or "final".
+        function endUtterance(reason) {
+            clearTimeout(silenceTimer);
+            const text = (finalText + " " + interimText).replace(/\s+/g, " ").trim();
+            if (text) {
+                pushUtterance({
+                    text: text,
+                    reason: reason,
+                    speechStart: speechStart,
+                    speechEnd: speechEnd,
+                    finalAt: performance.now(),
+                    interimUsed: interimText.trim().length > 0
+                });
+            }
+            interimParts.forEach(function(part) {
+                carried[part[0]] = (carried[part[0]] || 0) + part[1].split(/\s+/).filter(Boolean).length;
+            });
+            interimParts = [];
+            finalText = "";
+            interimText = "";
+            speechStart = null;
+            speechEnd = null;
+        }
+
+        function startRecognition() {
+            if (running) {
+                return;
+            }
+            running = true;
+            recognition = new webkitSpeechRecognition() || new SpeechRecognition();
+            recognition.lang = '';
+            recognition.continuous = true;
+            recognition.interimResults = true;
+
+            recognition.onresult = function(event) {
+                const now = performance.now();
+                let interim = "";
+                interimParts = [];
+                for (let i = Math.max(event.resultIndex, consumedIndex + 1); i < event.results.length; i++) {
+                    const transcript = newWords(i, event.results[i][0].transcript);
+                    if (event.results[i].isFinal) {
+                        finalText += " " + transcript;
+                        consumedIndex = i;
+                        delete carried[i];
+                    } else {
+                        interim += " " + transcript;
+                        interimParts.push([i, transcript]);
+                    }
+                }
+                interimText = interim;
+                if (!(finalText + interimText).trim()) {
+                    return;
+                }
+                if (speechStart === null) {
+                    speechStart = now;
+                }
+                speechEnd = now;
+
+                // Wait for trailing silence before ending the utterance, unless it has run too long.
+                clearTimeout(silenceTimer);
+                if (now - speechStart >= maxUtterance) {
+                    endUtterance("max");
+                } else {
+                    silenceTimer = setTimeout(function() {
+                        endUtterance(interimText.trim() ? "silence" : "final");
+                    }, silenceTimeout);
+                }
+            };
+
+            recognition.onspeechend = function() {
+                speechEnd = performance.now();
+            };
+
+            // The browser ends a continuous session on its own now and then; keep it running.
+            recognition.onend = function() {
+                endUtterance("final");
+                consumedIndex = -1;  // Result indexes start again with the new session.
+                carried = {};
+                if (running) {
+                    recognition.start();
+                }
+            };
+            recognition.start();
+        }
+
+        function stopRecognition() {
+            running = false;
+            recognition.stop();
+            flushUtterances();
+        }
+    </script>
+</body>
+</html>'''
+
+# Function to build the recognition page for the input language and endpointing settings.
+def RecognitionPage():
+    Page = HtmlCode.replace('recognition.lang = \'\'', f"recognition.lang = '{InputLanguage}'")
+    Page = Page.replace("silenceTimeout = 800", f"silenceTimeout = {int(SpeechSilenceTimeout * 1000)}")
+    return Page.replace("maxUtterance = 15000", f"maxUtterance = {int(SpeechMaxUtterance * 1000)}")
+
+# Common interface of the speech engines. Next returns one finished utterance as a dict with its text,
+# how it ended ("final", "silence" or "max") and speechStart/speechEnd/finalAt times in milliseconds,
+# or None once a recorded input has been used up.
+class SpeechEngine:
+
+    # Get ready to listen; called again is a no-op.
+    def Start(self):
+        raise NotImplementedError
+
+    # Block until the next utterance is finished (None if Timeout seconds pass first, the input ended
+    # or the optional CancelToken was cancelled).
+    def Next(self, Timeout=None, Cancel=None):
+        raise NotImplementedError
+
+    # Drop the utterances finished so far; returns how many were dropped.
+    def Flush(self):
+        raise NotImplementedError
+
+    # Stop listening; the next call to Next starts again.
+    def Stop(self):
+        raise NotImplementedError
+
+    # Do the slow part of getting ready (starting a browser, loading a model) without listening yet.
+    def WarmUp(self):
+        pass
+
+# Browser engine: headless Chrome running the Web Speech API on a page that stays loaded between turns.
+class ChromeEngine(SpeechEngine):
+
+    def __init__(self, InputFile=None):
+        self.InputFile = InputFile  # A WAV file Chrome plays as its fake microphone.
+        self.Driver = None
+        self.Started = False
+        self.LastId = 0  # Id of the last utterance handed out.
+        self.Lock = threading.Lock()  # The warm-up and the first turn may both ask for the driver.
+        self.Waiter = None  # Future of the wait in the page, kept across a cancelled Next so nothing said is lost.
+        self.Pool = None
+
+    # Start Chrome on first use, so importing the module opens no browser and needs no network.
+    def GetDriver(self):
+        with self.Lock:
+            if self.Driver is None:
+                from selenium import webdriver
+                from selenium.webdriver.chrome.service import Service
+                from selenium.webdriver.chrome.options import Options
+                from webdriver_manager.chrome import ChromeDriverManager
+
+                # Set Chrome options for the WebDriver.
+                chrome_options = Options()
+                user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
+                chrome_options.add_argument(f"user-agent={user_agent}")
+                chrome_options.add_argument("--use-fake-ui-for-media-stream")
+                chrome_options.add_argument("--use-fake-device-for-media-stream")
+                if self.InputFile:
+                    chrome_options.add_argument(f"--use-file-for-fake-audio-capture={os.path.abspath(self.InputFile)}")
+                chrome_options.add_argument("--headless=new")
+
+                # Initialize the Chrome WebDriver using the ChromeDriverManager.
+                self.Driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        return self.Driver
+
+    def WarmUp(self):
+        self.GetDriver()
+
+    # Load the page and start the recognizer, once.
+    def Start(self):
+        if self.Started:
+            return
+        from selenium.webdriver.common.by import By
+
+        # Write the recognition page and open it in the browser.
+        with open(os.path.join("Data", "Voice.html"), "w") as f:
+            f.write(RecognitionPage())
+        Link = f"{os.getcwd()}/Data/Voice.html"
+
+        Driver = self.GetDriver()
+        Driver.get(f"file:///" + Link)
+        self.LastId = 0  # A freshly loaded page numbers its utterances from 1 again.
+        self.Waiter = None  # Any wait on the old page ended before the new one loaded.
+        Driver.find_element(by=By.ID, value="start").click()
+        Driver.set_script_timeout(SpeechWaitTimeout)
+        self.Started = True
+
+    # Wait in the page for the utterance after LastId, on the wait thread.
+    def _Wait(self, AfterId):
+        return self.Driver.execute_async_script("nextUtterance(arguments[0], arguments[arguments.length - 1]);", AfterId)
+
+    # Start a wait in the page unless one is still running. ChromeDriver runs one command at a time per
+    # browser, so a wait cannot be ended from outside; a cancelled Next leaves it running for the next call.
+    def _Arm(self):
+        if self.Waiter is None:
+            if self.Pool is None:
+                self.Pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ChromeWait")
+            self.Waiter = self.Pool.submit(self._Wait, self.LastId)
+        return self.Waiter
+
+    def Next(self, Timeout=None, Cancel=None):
+        from selenium.common.exceptions import TimeoutException, JavascriptException
+        self.Start()
+        Deadline = None if Timeout is None else perf_counter() + Timeout
+        while Cancel is None or not Cancel.Cancelled:
+            Waiter = self._Arm()
+            Woken = threading.Event()
+            Waiter.add_done_callback(lambda Done: Woken.set())
+            Unregister = Cancel.OnCancel(Woken.set) if Cancel is not None else lambda: None
+            try:
+                Woken.wait(None if Deadline is None else max(Deadline - perf_counter(), 0))
+            finally:
+                Unregister()
+            if not Waiter.done():
+                return None  # Cancelled or timed out; the wait goes on for the next call.
+            self.Waiter = None
+            try:
+                Utterance = Waiter.result()
+                if Utterance["id"] > self.LastId:
+                    self.LastId = Utterance["id"]
+                    return Utterance
+            except TimeoutException:
+                pass  # Nothing was said yet; wait again.
+            except JavascriptException:
+                self.Started = False  # The page was lost; load it again.
+                self.Start()
+            if Deadline is not None and perf_counter() >= Deadline:
+                return None
+        return None
+
+    def Flush(self):
+        if not self.Started:
+            return 0
+        # A wait still running means nothing was queued when it began and nothing has been said since.
+        if self.Waiter is not None and not self.Waiter.done():
+            return 0
+        if self.Waiter is not None:
+            Waiter, self.Waiter = self.Waiter, None
+            if Waiter.exception() is None:
+                self.LastId = max(self.LastId, Waiter.result()["id"])  # Heard after a cancelled Next; still queued in the page.
+        return self.Driver.execute_script("return flushUtterances();")
+
+    def Stop(self):
+        if self.Started:
+            from selenium.webdriver.common.by import By
+            self.Driver.find_element(by=By.ID, value="end").click()
+            self.Started = False
+
+# Audio from a recorded WAV file (16-bit mono PCM), read as fast as possible or at real-time pace.
+class WavSource:
+
+    def __init__(self, Path, Realtime=False, ChunkSeconds=0.1):
+        self.Path = Path
+        self.Realtime = Realtime
+        self.ChunkSeconds = ChunkSeconds
+        self.Rate = None
+        self.Seconds = 0.0  # Audio read so far.
+
+    def Chunks(self):
+        with wave.open(self.Path, "rb") as f:
+            if f.getnchannels() != 1 or f.getsampwidth() != 2:
+                raise ValueError(f"{self.Path} must be 16-bit mono PCM audio.")
+            self.Rate = f.getframerate()
+            Frames = int(self.Rate * self.ChunkSeconds)
+            Started = perf_counter()
+            while True:
+                Data = f.readframes(Frames)
+                if not Data:
+                    return
+                self.Seconds += len(Data) / 2 / self.Rate
+                if self.Realtime:
+                    Ahead = self.Seconds - (perf_counter() - Started)
+                    if Ahead > 0:
+                        threading.Event().wait(Ahead)
+                yield Data
+
+    def Close(self):
+        pass
+
+# Audio from the default microphone through sounddevice.
+class MicrophoneSource:
+
+    def __init__(self, Rate=16000, ChunkSeconds=0.1):
+        self.Rate = Rate
+        self.ChunkSeconds = ChunkSeconds
+        self.Seconds = 0.0
+        self.Queue = queue.Queue()
+        self.Stream = None
+
+    def Chunks(self):
+        import sounddevice
+        self.Stream = sounddevice.RawInputStream(
+            samplerate=self.Rate, blocksize=int(self.Rate * self.ChunkSeconds), dtype="int16", channels=1,
+            callback=lambda data, frames, time, status: self.Queue.put(bytes(data)),
+        )
+        self.Stream.start()
+        while self.Stream is not None:
+            Data = self.Queue.get()
+            if Data is None:
+                return
+            self.Seconds += len(Data) / 2 / self.Rate
+            yield Data
+
+    def Close(self):
+        if self.Stream is not None:
+            self.Stream.stop()
+            self.Stream.close()
+            self.Stream = None
+        self.Queue.put(None)
+
+# Local engine: Vosk decoding on the CPU from the microphone or a WAV file, with the same endpointing
+# rules as the browser page. Times are measured on the audio clock.
+class VoskEngine(SpeechEngine):
+
+    def __init__(self, InputFile=None, Realtime=True, ModelPath=VoskModelPath):
+        self.InputFile = InputFile
+        self.Realtime = Realtime
+        self.ModelPath = ModelPath
+        self.Model = None
+        self.Source = None
+        self.Utterances = queue.Queue()
+        self.Thread = None
+        self.Ended = threading.Event()  # Set once a recorded input has been used up.
+        self.Lock = threading.Lock()  # The warm-up and the first turn may both ask for the model.
+
+    # Function to load the model once.
+    def GetModel(self):
+        with self.Lock:
+            if self.Model is None:
+                from vosk import Model, SetLogLevel
+                SetLogLevel(-1)
+                if self.ModelPath:
+                    self.Model = Model(model_path=self.ModelPath)
+                else:
+                    self.Model = Model(lang=VoskLanguage(InputLanguage))
+        return self.Model
+
+    def WarmUp(self):
+        self.GetModel()
+
+    def Start(self):
+        if self.Thread is not None and self.Thread.is_alive():
+            return
+        self.GetModel()
+        self.Ended.clear()
+        self.Source = WavSource(self.InputFile, self.Realtime) if self.InputFile else MicrophoneSource()
+        self.Thread = threading.Thread(target=self._Decode, name="VoskEngine", daemon=True)
+        self.Thread.start()
+
+    def Next(self, Timeout=None, Cancel=None):
+        if not self.Ended.is_set():
+            self.Start()
+        Deadline = None if Timeout is None else perf_counter() + Timeout
+        while Cancel is None or not Cancel.Cancelled:
+            Wait = 0.1 if Deadline is None else min(0.1, max(Deadline - perf_counter(), 0))
+            try:
+                return self.Utterances.get(timeout=Wait)
+            except queue.Empty:
+                if self.Ended.is_set() and self.Utterances.empty():
+                    return None
+                if Deadline is not None and perf_counter() >= Deadline:
+                    return None
+        return None
+
+    def Flush(self):
+        Count = 0
+        while True:
+            try:
+                self.Utterances.get_nowait()
+                Count += 1
+            except queue.Empty:
+                return Count
+
+    def Stop(self):
+        if self.Source is not None:
+            self.Source.Close()
+
+    def _Decode(self):
+        from vosk import KaldiRecognizer
+        Recognizer = None
+        Segments, Partial = [], ""
+        SpeechStart = SpeechEnd = None
+
+        def End(Reason, Now):
+            nonlocal Segments, Partial, SpeechStart, SpeechEnd
+            Text = " ".join(Segments + [loads(Recognizer.FinalResult()).get("text", "")]).strip()
+            if Text:
+                self.Utterances.put({
+                    "text": Text,
+                    "reason": Reason,
+                    "speechStart": SpeechStart * 1000,
+                    "speechEnd": SpeechEnd * 1000,
+                    "finalAt": Now * 1000,
+                    "interimUsed": bool(Partial),
+                })
+            Segments, Partial = [], ""
+            SpeechStart = SpeechEnd = None
+
+        try:
+            for Data in self.Source.Chunks():
+                if Recognizer is None:
+                    Recognizer = KaldiRecognizer(self.Model, self.Source.Rate)
+                Now = self.Source.Seconds
+                if Recognizer.AcceptWaveform(Data):
+                    Text = loads(Recognizer.Result()).get("text", "")
+                    if Text:
+                        Segments.append(Text)
+                        SpeechStart = SpeechStart if SpeechStart is not None else Now
+                        SpeechEnd = Now
+                    Partial = ""
+                else:
+                    Text = loads(Recognizer.PartialResult()).get("partial", "")
+                    if Text and Text != Partial:
+                        SpeechStart = SpeechStart if SpeechStart is not None else Now
+                        SpeechEnd = Now
+                    Partial = Text
+
+                if SpeechStart is None:
+                    continue
+                if Now - SpeechStart >= SpeechMaxUtterance:
+                    End("max", Now)
+                elif Now - SpeechEnd >= SpeechSilenceTimeout:
+                    End("silence" if Partial else "final", Now)
+
+            if Recognizer is not None and SpeechStart is not None:
+                End("final", self.Source.Seconds)
+        except Exception as e:
+            print(f"Error in local speech engine: {e}")
+        finally:
+            self.Ended.set()
+
+# Function to create the configured engine.
+def CreateEngine(Name=SpeechEngineName, InputFile=SpeechInputFile, Realtime=True):
+    if Name == "chrome":
+        return ChromeEngine(InputFile)
+    if Name == "vosk":
+        return VoskEngine(InputFile, Realtime)
+    raise ValueError(f"Unknown speech engine: {Name}")
@@ -1,87 +1,37 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import dotenv_values
+from time import perf_counter, process_time
+from collections import deque
+import wave
+import sys
 import os
-import mtranslate as mt
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.StateBus import Bus
+from Backend.SpeechEngines import CreateEngine, SpeechEngineName
+from Backend.Translator import Translate, TranslateLater
+from Backend.Cancellation import Cancelled
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
 
 # Get the input language setting from the environment variables.
 InputLanguage = env_vars.get("InputLanguage")
-# Define the HTML code for the speech recognition interface.
-HtmlCode = '''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <title>Speech Recognition</title>
-</head>
-<body>
-    <button id="start" onclick="startRecognition()">Start Recognition</button>
-    <button id="end" onclick="stopRecognition()">Stop Recognition</button>
-    <p id="output"></p>
-    <script>
-        const output = document.getElementById('output');
-        let recognition;
-
-        function startRecognition() {
-            recognition = new webkitSpeechRecognition() || new SpeechRecognition();
-            recognition.lang = '';
-            recognition.continuous = true;
-
-            recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent += transcript;
-            };
-
-            recognition.onend = function() {
-                recognition.start();
-            };
-            recognition.start();
-        }
-
-        function stopRecognition() {
-            recognition.stop();
-            output.innerHTML = "";
-        }
-    </script>
-</body>
-</html>'''
-
-# Replace the language setting in the HTML code with the input language from the environment variables.
-HtmlCode = str(HtmlCode).replace('recognition.lang = \'\'', f"recognition.lang = '{InputLanguage}'")
-
-# Write the modified HTML code to a file.
-with open(r"Data\Voice.html", "w") as f:
-    f.write(HtmlCode)
-
-# Get the current working directory.
-current_dir = os.getcwd()
 
-# Generate the file path for the HTML file.
-Link = f"{current_dir}/Data/Voice.html"
+# Drop utterances heard between turns (usually the assistant's own voice) before listening again.
+SpeechFlushBetweenTurns = str(env_vars.get("SpeechFlushBetweenTurns", "True")).lower() != "false"
 
-# Set Chrome options for the WebDriver.
-chrome_options = Options()
-user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.142.86 Safari/537.36"
-chrome_options.add_argument(f"user-agent={user_agent}")
-chrome_options.add_argument("--use-fake-ui-for-media-stream")
-chrome_options.add_argument("--use-fake-device-for-media-stream")
-chrome_options.add_argument("--headless=new")
+# Longest wait (seconds) for the next utterance during a benchmark before the input is treated as finished.
+SpeechBenchmarkTimeout = 60
 
-# Initialize the Chrome WebDriver using the ChromeDriverManager.
-Service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=Service, options=chrome_options)
+# Get the current working directory.
+current_dir = os.getcwd()
 
 # Define the path for temporary files.
 TempDirPath = rf"{current_dir}/Frontend/Files"
 
-# Function to set the assistant's status by writing it to a file.
+# Function to set the assistant's status by publishing it on the state bus.
 def SetAssistantStatus(Status):
-    with open(rf"{TempDirPath}/Status.data", "w", encoding="utf-8") as file:
-        file.write(Status)
+    Bus.Publish("Status", Status)
 
 # Function to modify a query to ensure proper punctuation and formatting.
 def QueryModifier(Query):
@@ -105,46 +55,112 @@ def QueryModifier(Query):
 
     return new_query.capitalize()
 
-# Function to translate text into English using the mtranslate library.
+# Function to translate text into English through the cached, time-limited translator.
 def UniversalTranslator(Text):
-    english_translation = mt.translate(Text, "en", "auto")
+    english_translation = Translate(Text, "en", "auto")
     return english_translation.capitalize()
 
-# Function to perform speech recognition using the WebDriver.
-def SpeechRecognition():
-    # Open the HTML file in the browser.
-    driver.get(f"file:///" + Link)
-    
-    # Start speech recognition by clicking the start button.
-    driver.find_element(by=By.ID, value="start").click()
-
-    while True:
-      try:
-                # Inside SpeechRecognition()
-
-        # Get the recognized text from the HTML output element.
-            Text = driver.find_element(by=By.ID, value="output").text
-
-            if Text:
-    # Stop recognition by clicking the stop button.
-                driver.find_element(by=By.ID, value="end").click()
+# Timing of recent utterances: speech length, how it ended and how long the final result took after speech stopped.
+SpeechTimings = deque(maxlen=100)
+
+# Function to record the timing the engine reported for one utterance (engine times are in milliseconds).
+# HeardFrom and Arrived put the utterance on the perf_counter clock, so it can be matched with what was playing.
+def RecordTiming(Utterance):
+    Start, End, Final = Utterance.get("speechStart"), Utterance.get("speechEnd"), Utterance.get("finalAt")
+    Arrived = perf_counter()
+    Timing = {
+        "Text": Utterance.get("text", ""),
+        "HeardFrom": Arrived - (Final - Start) / 1000 if Start is not None and Final is not None else Arrived,
+        "Arrived": Arrived,
+        "EndedBy": Utterance.get("reason"),
+        "SpeechSeconds": (End - Start) / 1000 if Start is not None and End is not None else None,
+        "FinalDelaySeconds": (Final - End) / 1000 if End is not None and Final is not None else None,
+        "InterimUsed": bool(Utterance.get("interimUsed")),
+    }
+    SpeechTimings.append(Timing)
+    return Timing
+
+# Function to get when the last utterance began and when it arrived, on the perf_counter clock.
+def LastUtteranceSpan():
+    if not SpeechTimings:
+        return None
+    return SpeechTimings[-1]["HeardFrom"], SpeechTimings[-1]["Arrived"]
+
+# Function to summarize the recorded utterance timings.
+def SpeechTimingStats():
+    Timings = list(SpeechTimings)
+    Delays = [t["FinalDelaySeconds"] for t in Timings if t["FinalDelaySeconds"] is not None]
+    Lengths = [t["SpeechSeconds"] for t in Timings if t["SpeechSeconds"] is not None]
+    return {
+        "Utterances": len(Timings),
+        "AverageSpeechSeconds": sum(Lengths) / len(Lengths) if Lengths else 0.0,
+        "AverageFinalDelaySeconds": sum(Delays) / len(Delays) if Delays else 0.0,
+        "EndedBy": {Reason: sum(1 for t in Timings if t["EndedBy"] == Reason) for Reason in ("final", "silence", "max")},
+    }
+
+# The speech engine shared by every turn (chosen with SpeechEngine in .env); nothing starts until first use.
+Engine = CreateEngine()
+
+# Function to get the engine ready in the background, so the first turn does not wait for it.
+def WarmUpRecognition():
+    Engine.WarmUp()
+
+# Function to perform speech recognition with the configured engine.
+# Cancelling the optional CancelToken stops the wait and raises Cancelled.
+def SpeechRecognition(Flush=SpeechFlushBetweenTurns, Cancel=None):
+    # Forget what was heard while the assistant was busy, then wait for the next utterance.
+    if Flush:
+        Engine.Flush()
+    Utterance = Engine.Next(Cancel=Cancel)
+    if Utterance is None:
+        if Cancel is not None and Cancel.Cancelled:
+            raise Cancelled(Cancel.Reason)
+        raise EOFError("The speech input has ended.")
+    RecordTiming(Utterance)
+    Text = Utterance["text"]
 
     # If the input language is English, return the modified query.
-                if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
-                    return QueryModifier(Text)
-                else:
-        # If the input language is not English, translate it first.
-                    SetAssistantStatus("Translating ...")
-                    return QueryModifier(UniversalTranslator(Text))
-
-# Error handling
-      except Exception as e:
-            pass
+    if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
+        return QueryModifier(Text)
+    else:
+        # If the input language is not English, translate it first, updating the status while the call runs.
+        Translation = TranslateLater(Text, "en", "auto")
+        SetAssistantStatus("Translating ...")
+        return QueryModifier(Translation.result().capitalize())
+
+# Function to run an engine over a recorded WAV file as fast as it can and report its speed and CPU use.
+def BenchmarkSpeech(Path, Name=SpeechEngineName):
+    Bench = CreateEngine(Name, InputFile=Path, Realtime=False)
+    Started, CPUStarted = perf_counter(), process_time()
+    Utterances = []
+    while True:
+        Utterance = Bench.Next(Timeout=SpeechBenchmarkTimeout)
+        if Utterance is None:
+            break
+        Utterances.append(RecordTiming(Utterance))
+    Seconds, CPUSeconds = perf_counter() - Started, process_time() - CPUStarted
+    Bench.Stop()
+    with wave.open(Path, "rb") as f:
+        AudioSeconds = f.getnframes() / f.getframerate()
+    return {
+        "Engine": Name,
+        "AudioSeconds": AudioSeconds,
+        "Seconds": Seconds,
+        "CPUSeconds": CPUSeconds,
+        "RealTimeFactor": Seconds / AudioSeconds if AudioSeconds else 0.0,
+        "Utterances": Utterances,
+    }
 
 # === Main Execution Block ===
 if __name__ == "__main__":
-    while True:
-        # Continuously perform speech recognition
-        Text = SpeechRecognition()
-        print(Text)
-
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        Report = BenchmarkSpeech(sys.argv[2], *sys.argv[3:4])
+        for Utterance in Report.pop("Utterances"):
+            print(Utterance)
+        print(Report)
+        print(SpeechTimingStats())
+    else:
+        while True:
+            # Continuously perform speech recognition
+            Text = SpeechRecognition()
+            print(Text)
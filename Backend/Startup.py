@@ -0,0 +1,153 @@
+from time import perf_counter  # Import perf_counter to time imports and warm-up steps.
+import importlib  # Import importlib to load backends on first use.
+import threading  # Import threading for the warm-up thread and the timing lock.
+import sys  # Import sys to hook the import system when profiling.
+
+# When the program started, for the milestones in the startup report.
+Started = perf_counter()
+
+# Seconds per module: "Import" is the module's own top-level code (only measured with --profile-startup),
+# "Load" is a lazy backend's whole import including what it imports, "Init" is its warm-up step.
+StartupTimes = {}
+Milestones = {}
+TimesLock = threading.Lock()
+
+# Whether the import hook is installed.
+Profiling = False
+
+# Function to add time to a module's startup counters.
+def RecordTime(Name, Kind, Seconds):
+    with TimesLock:
+        Times = StartupTimes.setdefault(Name, {})
+        Times[Kind] = Times.get(Kind, 0.0) + Seconds
+
+# Function to note when a point in startup was reached.
+def Milestone(Name):
+    with TimesLock:
+        Milestones[Name] = perf_counter() - Started
+
+# Function to run a function and add its time to a module's counters; returns what it returns.
+def Timed(Name, Kind, Function, *Args):
+    Begin = perf_counter()
+    try:
+        return Function(*Args)
+    finally:
+        RecordTime(Name, Kind, perf_counter() - Begin)
+
+# A backend module that is imported the first time one of its attributes is used, so the window does not
+# wait for API clients, browsers or slow libraries it does not need yet.
+class LazyModule:
+
+    def __init__(self, Name):
+        self.Name = Name
+        self._Module = None
+        self._Lock = threading.Lock()
+
+    # Import the module, once; later calls return it at once.
+    def Load(self):
+        if self._Module is None:
+            with self._Lock:
+                if self._Module is None:
+                    self._Module = Timed(self.Name, "Load", importlib.import_module, self.Name)
+        return self._Module
+
+    # Whether the module was imported already.
+    def Loaded(self):
+        return self._Module is not None
+
+    def __getattr__(self, Attribute):
+        return getattr(self.Load(), Attribute)
+
+# Function to load backends in the background, most needed first. Steps are (LazyModule, init function name or None);
+# an init function that returns a future is waited on, so its time is counted. Returns the warm-up thread.
+def WarmUp(Steps, OnFinished=None):
+
+    def Wait(Result):
+        return Result.result() if hasattr(Result, "result") else Result
+
+    def Run():
+        for Module, Init in Steps:
+            try:
+                Module.Load()
+                if Init is not None:
+                    Timed(Module.Name, "Init", lambda: Wait(getattr(Module, Init)()))
+            except Exception as e:
+                print(f"Error warming up {Module.Name}: {e}")
+        Milestone("Warm-up finished")
+        if OnFinished is not None:
+            OnFinished()
+
+    Thread = threading.Thread(target=Run, name="WarmUp", daemon=True)
+    Thread.start()
+    return Thread
+
+# Loader wrapper that times a module's own top-level code, leaving out the modules it imports in turn.
+class TimedLoader:
+
+    Nesting = threading.local()
+
+    def __init__(self, Loader):
+        self.Loader = Loader
+
+    def __getattr__(self, Attribute):
+        return getattr(self.Loader, Attribute)
+
+    def create_module(self, Spec):
+        return self.Loader.create_module(Spec)
+
+    def exec_module(self, Module):
+        Stack = self.Nesting.__dict__.setdefault("Stack", [])
+        Stack.append(0.0)
+        Begin = perf_counter()
+        try:
+            self.Loader.exec_module(Module)
+        finally:
+            Total = perf_counter() - Begin
+            Nested = Stack.pop()
+            if Stack:
+                Stack[-1] += Total
+            RecordTime(Module.__name__, "Import", Total - Nested)
+
+# Import hook that wraps the loader of every module found by the other finders in a TimedLoader.
+class ImportTimer:
+
+    def find_spec(self, Name, Path=None, Target=None):
+        for Finder in sys.meta_path:
+            if Finder is self or not hasattr(Finder, "find_spec"):
+                continue
+            Spec = Finder.find_spec(Name, Path, Target)
+            if Spec is not None:
+                if Spec.loader is not None and hasattr(Spec.loader, "exec_module"):
+                    Spec.loader = TimedLoader(Spec.loader)
+                return Spec
+        return None
+
+# Function to start timing every import from now on (for --profile-startup).
+def ProfileImports():
+    global Profiling
+    if not Profiling:
+        sys.meta_path.insert(0, ImportTimer())
+        Profiling = True
+
+# Function to build the startup report: the milestones, then the slowest modules. Third-party modules are
+# added up per package; the assistant's own modules are listed one by one.
+def StartupReport(Top=25):
+    with TimesLock:
+        Marks = dict(Milestones)
+        Times = {Name: dict(Kinds) for Name, Kinds in StartupTimes.items()}
+
+    Rows = {}
+    for Name, Kinds in Times.items():
+        Key = Name if Name.split(".")[0] in ("Backend", "Frontend", "Main", "__main__") else Name.split(".")[0]
+        Row = Rows.setdefault(Key, {"Import": 0.0, "Load": 0.0, "Init": 0.0})
+        for Kind, Seconds in Kinds.items():
+            Row[Kind] += Seconds
+
+    Lines = ["Startup profile (seconds since start)"]
+    for Name, Seconds in sorted(Marks.items(), key=lambda Mark: Mark[1]):
+        Lines.append(f"  {Name:<40}{Seconds:>8.3f}")
+    Lines.append(f"  {'Module':<40}{'Import':>8}{'Load':>8}{'Init':>8}")
+    Order = sorted(Rows.items(), key=lambda Item: -max(Item[1]["Import"], Item[1]["Load"]) - Item[1]["Init"])
+    for Name, Row in Order[:Top]:
+        Lines.append(f"  {Name:<40}{Row['Import']:>8.3f}{Row['Load']:>8.3f}{Row['Init']:>8.3f}")
+    return "\n".join(Lines)
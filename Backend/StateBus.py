@@ -0,0 +1,101 @@
+import threading  # Import threading for the lock and condition shared by publishers and waiters.
+import queue      # Import queue for thread-safe subscriber queues on the backend side.
+import os         # Import os for the optional file mirror.
+from dotenv import dotenv_values  # Import dotenv to read the mirror setting.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Mirror every published value to Frontend/Files/<Topic>.data for external tools, unless disabled.
+StateFileMirror = str(env_vars.get("StateFileMirror", "True")).lower() != "false"
+
+# Topics carried by the bus and the file each one is mirrored to.
+Topics = {
+    "Mic": "Mic.data",
+    "Status": "Status.data",
+    "Responses": "Responses.data",
+}
+
+# In-process publish/subscribe bus for the assistant's shared state.
+class StateBus:
+
+    def __init__(self, MirrorDir=None):
+        self._cond = threading.Condition()
+        self._values = {}
+        self._callbacks = {}
+        self._queues = {}
+        self.MirrorDir = MirrorDir
+
+        if self.MirrorDir:
+            os.makedirs(self.MirrorDir, exist_ok=True)
+
+    # Publish a new value for a topic and notify every subscriber.
+    def Publish(self, Topic, Value):
+        with self._cond:
+            self._values[Topic] = Value
+            callbacks = list(self._callbacks.get(Topic, []))
+            queues = list(self._queues.get(Topic, []))
+            self._cond.notify_all()
+
+        for q in queues:
+            try:
+                q.put_nowait(Value)
+            except queue.Full:
+                pass  # A slow consumer only misses intermediate values, never blocks a publisher.
+
+        for callback in callbacks:
+            try:
+                callback(Value)
+            except Exception as e:
+                print(f"Error in StateBus subscriber for {Topic}: {e}")
+
+        self._Mirror(Topic, Value)
+
+    # Get the latest value of a topic without waiting.
+    def Get(self, Topic, Default=""):
+        with self._cond:
+            return self._values.get(Topic, Default)
+
+    # Register a callback that runs in the publisher's thread; returns a function that unsubscribes it.
+    def Subscribe(self, Topic, Callback):
+        with self._cond:
+            self._callbacks.setdefault(Topic, []).append(Callback)
+
+        def Unsubscribe():
+            with self._cond:
+                if Callback in self._callbacks.get(Topic, []):
+                    self._callbacks[Topic].remove(Callback)
+
+        return Unsubscribe
+
+    # Get a thread-safe queue that receives every value published to a topic from now on.
+    def Listen(self, Topic, MaxSize=0):
+        q = queue.Queue(maxsize=MaxSize)
+        with self._cond:
+            self._queues.setdefault(Topic, []).append(q)
+        return q
+
+    # Block without polling until the topic's value satisfies the predicate; returns the value or None on timeout.
+    def WaitFor(self, Topic, Predicate, Timeout=None):
+        with self._cond:
+            if self._cond.wait_for(lambda: Predicate(self._values.get(Topic, "")), timeout=Timeout):
+                return self._values.get(Topic, "")
+        return None
+
+    # Write the value to the mirror file atomically so readers never see a half-written answer.
+    def _Mirror(self, Topic, Value):
+        if not self.MirrorDir or Topic not in Topics:
+            return
+
+        path = os.path.join(self.MirrorDir, Topics[Topic])
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(str(Value))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error mirroring {Topic} to {path}: {e}")
+
+# The single bus shared by the GUI, Main and the backends.
+Bus = StateBus(os.path.join(os.getcwd(), "Frontend", "Files") if StateFileMirror else None)
@@ -1,97 +1,308 @@
-import pygame    # Import pygame library for handling audio playback
 import random    # Import random for generating random choices
 import asyncio   # Import asyncio for asynchronous operations
 import edge_tts  # Import edge_tts for text-to-speech functionality
 import os        # Import os for file path handling
+import re        # Import re for finding sentence boundaries in streamed text
+import queue     # Import queue for handing sentences and audio between pipeline stages
+import threading # Import threading for the synthesis and playback workers
 from dotenv import dotenv_values  # Import dotenv for reading environment variables
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.AudioCache import AudioCache, AudioKey  # Import the on-disk cache of synthesized clips
+from Backend.AudioOutput import GetAudioOutput, PollInterval  # Import the shared, always-open audio output
+from Backend.EventLoop import Submit, RunSync  # Import the shared event loop that synthesis runs on
 
 # Load environment variables from a .env file
 env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("AssistantVoice")  # Get the AssistantVoice from the environment variables
 
-# Asynchronous function to convert text to an audio file
-async def TextToAudioFile(text) -> None:
-    file_path = r"Data/speech.mp3"  # Define the path where the speech file will be saved
+# List of predefined responses for cases where the text is too long
+responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
+# Voice settings; the cache key includes them, so changing one never plays a stale clip
+SpeechPitch = '-10Hz'
+SpeechRate = '+13%'
+
+# Phrases synthesized in the background at startup so they play without a network call
+StockPhrases = list(responses)
 
-    if os.path.exists(file_path):
-        os.remove(file_path)  # If it exists, remove it to avoid overwriting errors
+# Clips synthesized so far, reused whenever the same text is spoken with the same voice
+Clips = AudioCache()
 
+# Long answers (more than 4 sentences and at least 250 characters) are cut to this many spoken sentences
+SpokenSentenceLimit = 2
+
+# A sentence ends at '.', '!' or '?' (optionally followed by closing quotes or brackets) and then whitespace
+SentenceEnd = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+# Asynchronous function to synthesize text and return the MP3 data
+async def SynthesizeAudio(text) -> bytes:
     # Create the communicate object to generate speech
-    communicate = edge_tts.Communicate(text, AssistantVoice, pitch='-10Hz', rate='+13%')
-    await communicate.save(r'Data/speech.mp3')  # Save the generated speech as an MP3 file
+    communicate = edge_tts.Communicate(text, AssistantVoice, pitch=SpeechPitch, rate=SpeechRate)
+    Data = b""
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            Data += chunk["data"]
+    return Data
+
+# Asynchronous function to convert text to an audio file; returns the path of the clip to play.
+# Cached clips are returned at once; new ones go into the cache (or to file_path if it cannot be written).
+async def TextToAudioFile(text, file_path=r"Data/speech.mp3") -> str:
+    Key = AudioKey(text, AssistantVoice, SpeechPitch, SpeechRate)
+    Cached = await asyncio.to_thread(Clips.Get, Key)
+    if Cached is not None:
+        return Cached
+
+    Data = await SynthesizeAudio(text)
+    try:
+        return await asyncio.to_thread(Clips.Put, Key, Data)
+    except OSError as e:
+        print(f"Error caching speech: {e}")
+        with open(file_path, "wb") as f:
+            f.write(Data)
+        return file_path
+
+# Function to read a clip from the cache, or None if it is not cached (run off the event loop)
+def ReadCachedClip(Key):
+    Cached = Clips.Get(Key)
+    if Cached is None:
+        return None
+    with open(Cached, "rb") as f:
+        return f.read()
+
+# Asynchronous function to get the audio of a text in memory, from the cache or from edge-tts
+async def TextToAudio(text) -> bytes:
+    Key = AudioKey(text, AssistantVoice, SpeechPitch, SpeechRate)
+    Cached = await asyncio.to_thread(ReadCachedClip, Key)
+    if Cached is not None:
+        return Cached
+
+    Data = await SynthesizeAudio(text)
+    try:
+        await asyncio.to_thread(Clips.Put, Key, Data)
+    except OSError as e:
+        print(f"Error caching speech: {e}")
+    return Data
+
+# Asynchronous function to synthesize the phrases that are not cached yet, a few at a time
+async def WarmUpClips(Phrases):
+    Limit = asyncio.Semaphore(3)
+
+    async def WarmUp(Phrase):
+        async with Limit:
+            try:
+                await TextToAudioFile(Phrase)
+            except Exception as e:
+                print(f"Error warming up speech: {e}")
+
+    Missing = [Phrase for Phrase in Phrases if not Clips.Contains(AudioKey(Phrase, AssistantVoice, SpeechPitch, SpeechRate))]
+    await asyncio.gather(*(WarmUp(Phrase) for Phrase in Missing))
+
+# Function to open the audio output and synthesize the stock phrases in the background; returns a future
+def WarmUpSpeech(Phrases=StockPhrases):
+    GetAudioOutput().Start()
+    return Submit(WarmUpClips(Phrases))
 
 # Function to manage Text-to-Speech (TTS) functionality
 def TTS(Text, func=lambda r=None: True):
     while True:
         try:
-            # Convert text to an audio file asynchronously
-            asyncio.run(TextToAudioFile(Text))
-
-            # Initialize pygame mixer for audio playback
-            pygame.mixer.init()
-
-            # Load and play the audio file
-            pygame.mixer.music.load(r'Data/speech.mp3')
-            pygame.mixer.music.play()
+            # Get the audio in memory and play it on the shared output
+            Output = GetAudioOutput()
+            Output.Enqueue(RunSync(TextToAudio(Text)), Text)
 
             # Wait for the audio to finish playing
-            while pygame.mixer.music.get_busy():
-                if func() ==False:
-                    break
-                pygame.time.Clock().tick(10)
+            Output.Wait(func)
 
             return True
-        
-        
+
+
         except Exception as e:
             print(f"Error in TTS:{e}")
         finally:
             try:
             # Call the provided function with False to signal the end of TTS
                 func(False)
-                pygame.mixer.music.stop()  # Stop the audio playback
-                pygame.mixer.quit()        # Quit the pygame mixer
             except Exception as e:  # Handle any exceptions during cleanup
                 print(f"Error in finally block: {e}")
 
+# Function to split text into sentences, keeping the unfinished tail for later
+def SplitSentences(Text):
+    Sentences = []
+    while True:
+        match = SentenceEnd.search(Text)
+        if not match:
+            return Sentences, Text
+        Sentence = Text[:match.end()].strip()
+        if Sentence:
+            Sentences.append(Sentence)
+        Text = Text[match.end():]
+
+# Pipeline that speaks a streamed answer sentence by sentence while the rest is still being generated
+class SpeechPipeline:
+
+    def __init__(self, func=lambda r=None: True, Cancel=None):
+        self.func = func
+        self.Text = ""           # Everything fed so far.
+        self.Buffer = ""         # Text after the last complete sentence.
+        self.Count = 0           # Number of complete sentences seen.
+        self.Held = []           # Sentences past the limit, held until we know whether to speak them.
+        self.Truncated = False
+        self.Said = ""           # Sentences handed to synthesis so far, including any pointer to the chat screen.
+        self.Stopped = threading.Event()
+        self.Sentences = queue.Queue()           # Sentences waiting for synthesis.
+        self.Audio = queue.Queue(maxsize=2)      # (sentence, clip) pairs waiting for playback.
+        self.Synthesizer = threading.Thread(target=self._Synthesize, daemon=True)
+        self.Player = threading.Thread(target=self._Play, daemon=True)
+        self.Synthesizer.start()
+        self.Player.start()
+        if Cancel is not None:
+            Cancel.OnCancel(self.Stop)  # Barge-in: go quiet as soon as the turn is cancelled.
+
+    # Feed the next piece of the answer; complete sentences are queued straight away.
+    def Feed(self, Delta):
+        if self.Truncated or self.Stopped.is_set():
+            return
+        self.Text += Delta
+        Sentences, self.Buffer = SplitSentences(self.Buffer + Delta)
+        for Sentence in Sentences:
+            self.Count += 1
+            if self.Count <= SpokenSentenceLimit:
+                self.Sentences.put(Sentence)
+            else:
+                self.Held.append(Sentence)
+        if self._IsLong():
+            self._Truncate()
+
+    # Signal that the answer is complete and queue whatever is left to say.
+    def Close(self):
+        if not self.Truncated:
+            if self._IsLong():
+                self._Truncate()
+            else:
+                for Sentence in self.Held + [self.Buffer.strip()]:
+                    if Sentence:
+                        self.Sentences.put(Sentence)
+        self.Sentences.put(None)
+
+    # Stop speaking at once and drop everything not yet played.
+    def Stop(self):
+        self.Stopped.set()
+        GetAudioOutput().Stop()
+
+    # Block until everything queued has been spoken (or playback was stopped).
+    def Wait(self):
+        self.Player.join()
+        return True
+
+    # Close the pipeline and wait for it to finish speaking.
+    def Finish(self):
+        self.Close()
+        return self.Wait()
+
+    # Same rule as TextToSpeech: more than 4 sentences and at least 250 characters is too long to read out.
+    def _IsLong(self):
+        return len(self.Text.split(".")) > 4 and len(self.Text) >= 250
+
+    # Stop queueing the answer and point the user to the chat screen instead.
+    def _Truncate(self):
+        self.Truncated = True
+        self.Held = []
+        self.Sentences.put(random.choice(responses))
+
+    # Worker that turns queued sentences into audio in memory, ahead of playback.
+    def _Synthesize(self):
+        while True:
+            Sentence = self.Sentences.get()
+            if Sentence is None or self.Stopped.is_set():
+                self.Audio.put(None)
+                return
+            self.Said += f" {Sentence}"
+            try:
+                self.Audio.put((Sentence, RunSync(TextToAudio(Sentence))))
+            except Exception as e:
+                print(f"Error in TTS:{e}")
+
+    # Playback goes on until func asks to stop or the pipeline is stopped.
+    def _KeepPlaying(self, r=None):
+        return self.func() != False and not self.Stopped.is_set()
+
+    # Worker that hands clips to the audio output as soon as they are ready; the output plays them back to back.
+    def _Play(self):
+        Output = GetAudioOutput()
+        try:
+            while True:
+                try:
+                    Data = self.Audio.get(timeout=PollInterval)
+                except queue.Empty:
+                    if not self._KeepPlaying():
+                        self.Stopped.set()
+                        break
+                    continue
+                if Data is None or self.Stopped.is_set():
+                    if Data is None and not Output.Wait(self._KeepPlaying):
+                        self.Stopped.set()
+                    break
+                Sentence, Clip = Data
+                Output.Enqueue(Clip, Sentence)
+        except Exception as e:
+            print(f"Error in TTS:{e}")
+        finally:
+            if self.Stopped.is_set():
+                Output.Stop()  # Stop the audio playback
+            self.Stopped.set()
+            try:
+                # Call the provided function with False to signal the end of TTS
+                self.func(False)
+            except Exception as e:  # Handle any exceptions during cleanup
+                print(f"Error in finally block: {e}")
+            # Drain the synthesizer so it never blocks on a full queue after playback stopped.
+            while self.Synthesizer.is_alive():
+                try:
+                    self.Audio.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+# Function to get what the assistant said between two perf_counter times, to recognise its echo
+def SpokenBetween(Begin, End):
+    return GetAudioOutput().PlayedBetween(Begin, End)
+
+# Function to speak a stream of text deltas sentence by sentence as they arrive
+def SpeakStream(Deltas, func=lambda r=None: True, Cancel=None):
+    Speech = SpeechPipeline(func, Cancel)
+    for Delta in Deltas:
+        Speech.Feed(Delta)
+    return Speech.Finish()
+
 # Function to manage Text-to-Speech with additional responses for long text
 def TextToSpeech(Text, func=lambda r=None: True):
-    Data = str(Text).split(".")  # Split the text by periods into a list of sentences
-
-    # List of predefined responses for cases where the text is too long
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information.",
-        "There's more text on the chat screen for you, sir.",
-        "Sir, take a look at the chat screen for additional text.",
-        "You'll find more to read on the chat screen, sir.",
-        "Sir, check the chat screen for the rest of the text.",
-        "The chat screen has the rest of the text, sir.",
-        "There's more to see on the chat screen, sir, please look.",
-        "Sir, the chat screen holds the continuation of the text.",
-        "You'll find the complete answer on the chat screen, kindly check it out sir.",
-        "Please review the chat screen for the rest of the text, sir.",
-        "Sir, look at the chat screen for the complete answer."
-    ]
-
-    # If the text is very long (more than 4 sentences and 250 characters), add a response message
-    if len(Data) > 4 and len(Text) >= 250:
-        TTS("." .join(Text.split(".")[0:2]) + "." + random.choice(responses), func)
-    else:
-        # Otherwise, just play the whole text
-        TTS(Text, func)
+    # Long text (more than 4 sentences and 250 characters) is cut short with a pointer to the chat screen
+    return SpeakStream([str(Text)], func)
 
 # Main execution loop
 if __name__ == "__main__":
     while True:
         # Prompt user for input and pass it to TextToSpeech function
         TextToSpeech(input("Enter the text: "))
-
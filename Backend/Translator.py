@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError  # Import a pool to run translations with a timeout.
+from collections import OrderedDict  # Import OrderedDict for least-recently-used ordering.
+from dotenv import dotenv_values  # Import dotenv to read the translation settings.
+import mtranslate as mt  # Import mtranslate for the translation calls.
+import threading  # Import threading so the cache can be shared between threads.
+import re  # Import re to split text into segments.
+
+# Load environment variables from the .env file.
+env_vars = dotenv_values(".env")
+
+# Translations kept in memory, and the longest wait (seconds) before the untranslated text is used instead.
+TranslationCacheSize = int(env_vars.get("TranslationCacheSize", 512))
+TranslationTimeout = float(env_vars.get("TranslationTimeout", 2.5))
+
+# Threads for translation calls, so a slow call never blocks the caller past its timeout.
+Executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="Translator")
+
+# Threads that wait on translations started with TranslateLater.
+Waiters = ThreadPoolExecutor(max_workers=2, thread_name_prefix="TranslateLater")
+
+# Sentence ends that split a text into separately cached segments.
+SegmentEnd = re.compile(r"(?<=[.!?।])\s+")
+
+# Totals for the cache and the calls made.
+TranslationStats = {"Hits": 0, "Misses": 0, "Calls": 0, "BatchedSegments": 0, "Timeouts": 0, "Errors": 0}
+
+Cache = OrderedDict()  # (text, source, target) -> translation
+CacheLock = threading.Lock()
+
+# Function to look up a cached translation.
+def CachedTranslation(Text, Source, Target):
+    with CacheLock:
+        Key = (Text, Source, Target)
+        if Key in Cache:
+            Cache.move_to_end(Key)
+            TranslationStats["Hits"] += 1
+            return Cache[Key]
+        TranslationStats["Misses"] += 1
+        return None
+
+# Function to store a translation, evicting the least recently used past the size limit.
+def CacheTranslation(Text, Source, Target, Translation):
+    with CacheLock:
+        Cache[(Text, Source, Target)] = Translation
+        Cache.move_to_end((Text, Source, Target))
+        while len(Cache) > TranslationCacheSize:
+            Cache.popitem(last=False)
+
+# Function to make one translation call.
+def CallTranslator(Text, Source, Target):
+    with CacheLock:
+        TranslationStats["Calls"] += 1
+    return mt.translate(Text, Target, Source)
+
+# Function to translate several segments with one call, one line per segment;
+# if the lines do not come back one for one, each segment is translated on its own.
+def CallTranslatorBatch(Segments, Source, Target):
+    if len(Segments) == 1:
+        return [CallTranslator(Segments[0], Source, Target)]
+    Lines = [Line.strip() for Line in CallTranslator("\n".join(Segments), Source, Target).split("\n")]
+    if len(Lines) == len(Segments) and all(Lines):
+        with CacheLock:
+            TranslationStats["BatchedSegments"] += len(Segments)
+        return Lines
+    return [CallTranslator(Segment, Source, Target) for Segment in Segments]
+
+# Function to translate a list of segments: cached ones at once, the rest in one batched call.
+# Segments not translated within the timeout are returned untranslated.
+def TranslateBatch(Segments, Target="en", Source="auto", Timeout=TranslationTimeout):
+    Results = [CachedTranslation(Segment, Source, Target) for Segment in Segments]
+    Missing = [i for i, Result in enumerate(Results) if Result is None]
+    if not Missing:
+        return Results
+
+    Future = Executor.submit(CallTranslatorBatch, [Segments[i] for i in Missing], Source, Target)
+    try:
+        Translations = Future.result(timeout=Timeout)
+    except TimeoutError:
+        with CacheLock:
+            TranslationStats["Timeouts"] += 1
+        print("Translation timed out; using the original text.")
+        Translations = None
+    except Exception as e:
+        with CacheLock:
+            TranslationStats["Errors"] += 1
+        print(f"Error translating text: {e}")
+        Translations = None
+
+    for Position, i in enumerate(Missing):
+        if Translations is None:
+            Results[i] = Segments[i]
+        else:
+            Results[i] = Translations[Position]
+            CacheTranslation(Segments[i], Source, Target, Results[i])
+    return Results
+
+# Function to translate a text, caching it sentence by sentence.
+def Translate(Text, Target="en", Source="auto", Timeout=TranslationTimeout):
+    Segments = [Segment.strip() for Segment in SegmentEnd.split(str(Text)) if Segment.strip()]
+    if not Segments:
+        return ""
+    return " ".join(TranslateBatch(Segments, Target, Source, Timeout))
+
+# Function to start a translation in the background; the result is read with .result().
+def TranslateLater(Text, Target="en", Source="auto", Timeout=TranslationTimeout):
+    return Waiters.submit(Translate, Text, Target, Source, Timeout)
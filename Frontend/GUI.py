@@ -1,9 +1,12 @@
 from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QStackedWidget, QWidget,QLineEdit, QGridLayout, QVBoxLayout, QHBoxLayout, QPushButton,QFrame, QLabel, QSizePolicy
-from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat, QTextCursor
+from PyQt5.QtCore import Qt, QSize, QObject, pyqtSignal, QTimer
 from dotenv import dotenv_values
 import sys
 import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Backend.StateBus import Bus
 
 
 old_chat_message=""
@@ -44,24 +47,19 @@ def QueryModifier(Query):
 
 # Function to set microphone status
 def SetMicrophoneStatus(Command):
-    with open(rf"{TempDirPath}\Mic.data", 'w', encoding='utf-8') as file:
-        file.write(Command)
+    Bus.Publish("Mic", Command)
 
 # Function to get microphone status
 def GetMicrophoneStatus():
-    with open(rf"{TempDirPath}\Mic.data", 'r', encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return Bus.Get("Mic")
 
 # Function to set assistant's running status
 def SetAssistantStatus(Status):
-    with open(rf"{TempDirPath}\Status.data", 'w', encoding='utf-8') as file:
-        file.write(Status)
+    Bus.Publish("Status", Status)
+
 # Function to get assistant's running status
 def GetAssistantStatus():
-    with open(rf"{TempDirPath}\Status.data", 'r', encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return Bus.Get("Status")
 
 # Function to set mic button to initialized
 def MicButtonInitialized():
@@ -81,10 +79,42 @@ def TempDirectoryPath(Filename):
     Path = rf"{TempDirPath}\{Filename}"
     return Path
 
-# Function to show text on screen (save response)
+# Function to show text on screen (publish response)
 def ShowTextToScreen(Text):
-    with open(rf"{TempDirPath}\Responses.data", 'w', encoding='utf-8') as file:
-        file.write(Text)
+    Bus.Publish("Responses", Text)
+
+# Function to start a streamed message on screen with the given prefix
+def StartTextStream(Prefix):
+    Bus.Publish("ResponseStream", ("start", Prefix))
+
+# Function to append a piece of a streamed message to the current message on screen
+def StreamTextToScreen(Delta):
+    Bus.Publish("ResponseStream", ("delta", Delta))
+
+# Function to finish a streamed message and publish its full text as the latest response
+def EndTextStream(Text):
+    Bus.Publish("ResponseStream", ("end", Text))
+    ShowTextToScreen(Text)
+
+# Qt signals fed by the state bus, so widgets update from the GUI thread without polling
+class StateSignals(QObject):
+    MicChanged = pyqtSignal(str)
+    StatusChanged = pyqtSignal(str)
+    ResponseReceived = pyqtSignal(str)
+    StreamReceived = pyqtSignal(object)
+
+Signals = None
+
+# Function to get the shared state signals, connecting them to the bus on first use
+def GetStateSignals():
+    global Signals
+    if Signals is None:
+        Signals = StateSignals()
+        Bus.Subscribe("Mic", Signals.MicChanged.emit)
+        Bus.Subscribe("Status", Signals.StatusChanged.emit)
+        Bus.Subscribe("Responses", Signals.ResponseReceived.emit)
+        Bus.Subscribe("ResponseStream", Signals.StreamReceived.emit)
+    return Signals
 
 # UI Section - Chat Section Widget
 class ChatSection(QWidget):
@@ -134,10 +164,12 @@ class ChatSection(QWidget):
             font.setPointSize(13)
             self.chat_text_edit.setFont(font)
 
-            self.timer = QTimer(self)
-            self.timer.timeout.connect(self.loadMessages)
-            self.timer.timeout.connect(self.SpeechRecogText)
-            self.timer.start(5)
+            signals = GetStateSignals()
+            signals.ResponseReceived.connect(self.loadMessages)
+            signals.StreamReceived.connect(self.streamMessage)
+            signals.StatusChanged.connect(self.SpeechRecogText)
+            self.loadMessages(Bus.Get("Responses"))
+            self.SpeechRecogText(Bus.Get("Status"))
 
             self.chat_text_edit.viewport().installEventFilter(self)
             self.setStyleSheet("""
@@ -172,12 +204,9 @@ class ChatSection(QWidget):
                     background: none;
                     }
             """)
-        def loadMessages(self):
+        def loadMessages(self, messages):
             global old_chat_message
 
-            with open(TempDirectoryPath('Responses.data'), "r", encoding='utf-8') as file:
-                messages = file.read()
-
             if None == messages:
                 pass
             elif len(messages) <= 1:
@@ -188,10 +217,20 @@ class ChatSection(QWidget):
                 self.addMessage(message=messages, color='White')
                 old_chat_message = messages
 
-        def SpeechRecogText(self):
-            with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-                messages = file.read()
-                self.label.setText(messages)
+        def streamMessage(self, event):
+            global old_chat_message
+
+            kind, text = event
+            if kind == "start":
+                self.addMessage(message=text, color='White', end="")
+            elif kind == "delta":
+                self.addMessage(message=text, color='White', append=True, end="")
+            else:
+                self.addMessage(message="", color='White', append=True)
+                old_chat_message = text  # The full text follows on Responses; it is already on screen.
+
+        def SpeechRecogText(self, messages):
+            self.label.setText(messages)
 
         def load_icon(self, path, width=60, height=60):
             pixmap = QPixmap(path)
@@ -207,16 +246,19 @@ class ChatSection(QWidget):
                 MicButtonClosed()
             self.toggled = not self.toggled
 
-        def addMessage(self, message, color):
+        def addMessage(self, message, color, append=False, end="\n"):
             cursor = self.chat_text_edit.textCursor()
+            if append:
+                cursor.movePosition(QTextCursor.End)  # Continue the current message in place.
             format = QTextCharFormat()
-            formatm = QTextBlockFormat()
-            formatm.setTopMargin(10)
-            formatm.setLeftMargin(10)
             format.setForeground(QColor(color))
             cursor.setCharFormat(format)
-            cursor.setBlockFormat(formatm)
-            cursor.insertText(message + "\n")
+            if not append:
+                formatm = QTextBlockFormat()
+                formatm.setTopMargin(10)
+                formatm.setLeftMargin(10)
+                cursor.setBlockFormat(formatm)
+            cursor.insertText(message + end)
             self.chat_text_edit.setTextCursor(cursor)
 
 class InitialScreen(QWidget):
@@ -259,14 +301,12 @@ class InitialScreen(QWidget):
             self.setFixedHeight(screen_height)
             self.setFixedWidth(screen_width)
             self.setStyleSheet("background-color: black;")
-            self.timer = QTimer(self)
-            self.timer.timeout.connect(self.SpeechRecogText)
-            self.timer.start(5)
+            signals = GetStateSignals()
+            signals.StatusChanged.connect(self.SpeechRecogText)
+            self.SpeechRecogText(Bus.Get("Status"))
 
-        def SpeechRecogText(self):
-            with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-                messages = file.read()
-                self.label.setText(messages)
+        def SpeechRecogText(self, messages):
+            self.label.setText(messages)
 
         def load_icon(self, path, width=60, height=60):
             pixmap = QPixmap(path)
@@ -439,10 +479,13 @@ class MainWindow(QMainWindow):
             top_bar = CustomTopBar(self, stacked_widget)
             self.setMenuWidget(top_bar)
             self.setCentralWidget(stacked_widget)
-def GraphicalUserInterface():
+# OnShown is called on the GUI thread once the window is up, for work that should not delay it.
+def GraphicalUserInterface(OnShown=None):
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    if OnShown is not None:
+        QTimer.singleShot(0, OnShown)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
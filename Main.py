@@ -2,6 +2,13 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
+from Backend.Startup import LazyModule, WarmUp, Milestone, ProfileImports, StartupReport
+
+# --profile-startup times every import from here on and prints a report once the warm-up is done.
+ProfileStartup = "--profile-startup" in sys.argv
+if ProfileStartup:
+    ProfileImports()
+
 from Frontend.GUI import (
     GraphicalUserInterface,
     SetAssistantStatus,
@@ -11,20 +18,41 @@ from Frontend.GUI import (
     AnswerModifier,
     QueryModifier,
     GetMicrophoneStatus,
-    GetAssistantStatus
+    GetAssistantStatus,
+    StartTextStream,
+    StreamTextToScreen,
+    EndTextStream
 )
-from Backend.Model import FirstLayerDMM
-from Backend.RealtimeSearchEngine import RealtimeSearchEngine
-from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
-from Backend.TextToSpeech import TextToSpeech
+from Backend.StateBus import Bus
+from Backend.ChatStore import GetChatStore
+from Backend.Cancellation import CancelToken, Cancelled
+from Backend.Pipeline import Pipeline
+from Backend.EventLoop import Submit
 from dotenv import dotenv_values
-from asyncio import run
-from time import sleep
 import subprocess
 import threading
-import json
+import queue
+import re
+
+# Backends, imported on first use so the window opens without waiting for their clients, browser or libraries.
+Model = LazyModule("Backend.Model")
+Speculation = LazyModule("Backend.Speculation")
+RealtimeSearchEngine = LazyModule("Backend.RealtimeSearchEngine")
+Automation = LazyModule("Backend.Automation")
+SpeechToText = LazyModule("Backend.SpeechToText")
+Chatbot = LazyModule("Backend.Chatbot")
+TextToSpeech = LazyModule("Backend.TextToSpeech")
+
+# What is loaded in the background once the window is shown, most needed first, with each backend's own warm-up.
+WarmUpSteps = [
+    (SpeechToText, "WarmUpRecognition"),  # start Chrome or load the local model
+    (Model, None),
+    (Chatbot, None),
+    (RealtimeSearchEngine, None),
+    (Speculation, None),
+    (TextToSpeech, "WarmUpSpeech"),  # open the audio output and synthesize the stock phrases
+    (Automation, None),
+]
 
 # ------------ ENV SETUP ------------
 env_vars = dotenv_values(".env")
@@ -36,19 +64,32 @@ DefaultMessage = f'''{Username} : Hello {Assistantname}, How are you?
 subprocesses = []
 Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
 
+# Barge-in: "off", "mic" (pressing the mic button interrupts the assistant) or "speech" (talking over it does too)
+BargeIn = str(env_vars.get("BargeIn", "mic")).lower()
+
+Turns = []                 # Turns between capture and the end of speech, oldest first
+TurnsLock = threading.Lock()
+CaptureListen = None       # CancelToken of the listen in progress, so switching the mic off stops it
+
+# Something heard while the assistant speaks is its echo only if nearly all of its words fall in runs of at
+# least EchoMinRun words, in order and without gaps, of what was played meanwhile. A long echo survives a
+# misheard word; a follow-up that merely reuses a few of the answer's words still gets through.
+EchoCoverage = 0.9
+EchoMinRun = 3
+
+# Seconds of playback before an utterance began that still count for the echo check, since the room and
+# the recognizer both lag behind the speaker.
+EchoTail = 2.0
+
 # ------------ FUNCTIONS ------------
 def ShowDefaultChatIfNoChats():
-    File = open(r'Data\ChatLog.json', 'r', encoding='utf-8')
-    if len(File.read()) < 5:
+    if not GetChatStore().Messages():
         with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
             file.write("")
-        with open(TempDirectoryPath('Responses.data'), 'w', encoding='utf-8') as file:
-            file.write(DefaultMessage)
+        ShowTextToScreen(DefaultMessage)
 
 def ReadChatLogJson():
-    with open(r'Data\ChatLog.json', 'r', encoding='utf-8') as file:
-        chatlog_data = json.load(file)
-    return chatlog_data
+    return GetChatStore().Messages()
 
 def ChatLogIntegration():
     json_data = ReadChatLogJson()
@@ -72,9 +113,7 @@ def ShowChatsOnGUI():
         lines = Data.split('\n')
         result = '\n'.join(lines)
         File.close()
-        File = open(TempDirectoryPath('Responses.data'), 'w', encoding='utf-8')
-        File.write(result)
-        File.close()
+        ShowTextToScreen(result)
 
 def InitialExecution():
     SetMicrophoneStatus("False")
@@ -85,36 +124,172 @@ def InitialExecution():
 
 InitialExecution()
 
-def MainExecution():
-    TaskExecution = False
-    ImageExecution = False
-    ImageGenerationQuery = ""
+# Function to stream an answer onto the chat screen while it is generated; returns the full answer
+def StreamAnswerToScreen(Deltas):
+    StartTextStream(f"{Assistantname} : ")
+    Answer = ""
+    Shown = "\n"
+    for Delta in Deltas:
+        Answer += Delta
+        Text = Delta
+        while "\n\n" in Text:
+            Text = Text.replace("\n\n", "\n")  # Drop empty lines as AnswerModifier would.
+        if Shown.endswith("\n"):
+            Text = Text.lstrip("\n")
+        if Text:
+            StreamTextToScreen(Text)
+            Shown = Text
+    Answer = AnswerModifier(Answer)
+    EndTextStream(f"{Assistantname} : {Answer}")
+    return Answer
+
+# Function to start every general and realtime part of a decision at once, each on its own thread
+def StartAnswerParts(Decision, Spec=None, Turn=None):
+    def General(QueryFinal):
+        yield from (Spec and Spec.GeneralAnswer(QueryFinal)) or Chatbot.ChatBotStream(QueryModifier(QueryFinal), Cancel=Turn)
+
+    def Realtime(QueryFinal):
+        Prompt = QueryModifier(QueryFinal)
+        yield from RealtimeSearchEngine.RealtimeSearchEngineStream(Prompt, Spec and Spec.SearchResults(Prompt), Turn)
+
+    Parts = []
+    for Queries in Decision:
+        QueryFinal = " ".join(Queries.split()[1:])
+        if Queries.startswith("general"):
+            Parts.append(Speculation.BackgroundStream(General(QueryFinal)))
+        elif Queries.startswith("realtime"):
+            Parts.append(Speculation.BackgroundStream(Realtime(QueryFinal)))
+    return Parts
+
+# Function to join the parts into one answer in decision order; later parts keep running while earlier ones are read
+def MergeAnswerParts(Parts):
+    for Index, Part in enumerate(Parts):
+        if Index > 0:
+            yield "\n"
+        yield from Part.Deltas()
+
+# Function to register a new turn as in flight
+def BeginTurn(Query):
+    Turn = {"Query": Query, "Cancel": CancelToken()}
+    with TurnsLock:
+        Turns.append(Turn)
+    return Turn
+
+# Function to take a finished or dropped turn off the in-flight list; the status goes back to listening when none are left
+def EndTurn(Turn):
+    with TurnsLock:
+        if Turn in Turns:
+            Turns.remove(Turn)
+        Idle = not Turns
+    if Idle and not Turn["Cancel"].Cancelled and GetMicrophoneStatus() == "True":
+        SetAssistantStatus("Listening ...")
+    Bus.Publish("Pipeline", TurnPipeline.Stats())
+
+# Function to cancel every turn in flight; the stages drop their items and speech goes quiet at once
+def CancelTurns(Reason):
+    with TurnsLock:
+        Cancelling = list(Turns)
+        Turns.clear()
+    for Turn in Cancelling:
+        Turn["Cancel"].Cancel(Reason)
+    if Cancelling:
+        print(f"Turn interrupted ({Reason})")
+
+# Function to interrupt the turns in flight whenever the mic button is pressed, and stop listening when it is switched off
+def OnMicChanged(Status):
+    if BargeIn != "off":
+        CancelTurns("mic")
+    Listening = CaptureListen
+    if Status != "True" and Listening is not None:
+        Listening.Cancel("mic")
+
+Bus.Subscribe("Mic", OnMicChanged)
 
-    SetAssistantStatus("Listening ...")
-    Query = SpeechRecognition()
-    ShowTextToScreen(f"{Username} : {Query}")
-    SetAssistantStatus("Thinking ...")
-    Decision = FirstLayerDMM(Query)
+# Function to tell whether something heard while the assistant speaks is just its own voice
+def IsEcho(Text, Played):
+    Words = re.findall(r"\w+", Text.lower())
+    PlayedWords = re.findall(r"\w+", Played.lower())
+    if not Words:
+        return True
+    # Mark the utterance's words that lie in a long enough run shared, in order and without gaps, with what was played.
+    MinRun = min(EchoMinRun, len(Words))
+    Covered, Runs = [False] * len(Words), [0] * (len(PlayedWords) + 1)
+    for i, Word in enumerate(Words):
+        Previous = 0
+        for j, PlayedWord in enumerate(PlayedWords, 1):
+            Previous, Runs[j] = Runs[j], (Previous + 1 if Word == PlayedWord else 0)
+            if Runs[j] >= MinRun:
+                Covered[i - Runs[j] + 1:i + 1] = [True] * Runs[j]
+    return sum(Covered) >= EchoCoverage * len(Words)
 
-    print("\nDecision :", Decision, "\n")
+# ------------ Pipeline stages ------------
+# Capture: wait for the mic, listen for the next utterance and start a turn for it. It keeps listening
+# while earlier answers are spoken; the assistant's own voice is ignored, and with speech barge-in real
+# speech cancels the turns in flight.
+def CaptureStage():
+    global CaptureListen
+    Flush = SpeechToText.SpeechFlushBetweenTurns and Bus.Get("Mic") != "True"  # Drop anything heard while the mic was off.
+    Bus.WaitFor("Mic", lambda status: status == "True")
+    with TurnsLock:
+        Idle = not Turns
+    if Idle:
+        SetAssistantStatus("Listening ...")
 
-    G = any([i for i in Decision if i.startswith("general")])
-    R = any([i for i in Decision if i.startswith("realtime")])
+    CaptureListen = CancelToken()
+    try:
+        Query = SpeechToText.SpeechRecognition(Flush=Flush, Cancel=CaptureListen)
+    except Cancelled:
+        return None
+    finally:
+        CaptureListen = None
 
-    Mearged_query = " and ".join(
-        [" ".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")]
-    )
+    # Compare it with everything played from shortly before it began until it arrived.
+    Span = SpeechToText.LastUtteranceSpan()
+    Played = TextToSpeech.SpokenBetween(Span[0] - EchoTail, Span[1]) if Span is not None else ""
+    if Played and IsEcho(Query, Played):
+        print(f"Dropped as echo: {Query}")
+        return None
+    if BargeIn == "speech":
+        CancelTurns("speech")
+    return BeginTurn(Query)
+
+# Route: decide what the query needs, speculating on the likely answer path while Cohere decides.
+def RouteStage(Turn):
+    Query = Turn["Query"]
+    # Only worth it when the decision needs a round trip.
+    Spec = Speculation.Speculation(Query, Cancel=Turn["Cancel"]) if Speculation.SpeculativeMode != "off" and Model.NeedsCohere(Query) else None
+
+    Decision = None
+    try:
+        Decision = Model.FirstLayerDMM(Query)
+    finally:
+        if Spec is not None and Decision is None:
+            Spec.Resolve([])  # The decision failed: stop everything started speculatively.
+
+    Route = Model.GetLastRoute()
+    print("\nDecision :", Decision, f"[{Route['Path']}, {Route['Seconds'] * 1000:.1f} ms]", "\n")
+
+    if Spec is not None:
+        Spec.Resolve(Decision)
+    Turn["Decision"] = Decision
+    Turn["Spec"] = Spec
+    return Turn
+
+# Execute: start automation, image generation and every answer part; they run while earlier turns are shown.
+def ExecuteStage(Turn):
+    Decision = Turn["Decision"]
+    ImageExecution = False
+    ImageGenerationQuery = ""
 
     for queries in Decision:
         if "generate " in queries:
             ImageGenerationQuery = str(queries)
             ImageExecution = True
 
-    for queries in Decision:
-        if not TaskExecution:
-            if any(queries.startswith(func) for func in Functions):
-                run(Automation(list(Decision)))
-                TaskExecution = True
+    # Run automation alongside the answers instead of before them.
+    Turn["Automation"] = None
+    if any(queries.startswith(func) for queries in Decision for func in Functions):
+        Turn["Automation"] = Submit(Automation.Automation(list(Decision)))
 
     if ImageExecution:
         with open(r"Frontend\Files\ImageGeneration.data", "w") as file:
@@ -127,52 +302,83 @@ def MainExecution():
         except Exception as e:
             print(f"Error starting ImageGeneration.py: {e}")
 
-    if G and R or R:
-        SetAssistantStatus("Searching ... ")
-        Answer = RealtimeSearchEngine(QueryModifier(Mearged_query))
-        ShowTextToScreen(f"{Assistantname} : {Answer}")
-        SetAssistantStatus("Answering ... ")
-        TextToSpeech(Answer)
+    Turn["Parts"] = StartAnswerParts(Decision, Turn["Spec"], Turn["Cancel"])
+    Turn["Exit"] = any(Queries.strip() == "exit" for Queries in Decision)
+    return Turn
+
+# Function to pass each delta on unchanged while copying it into a queue; None marks the end
+def Relay(Deltas, Queue):
+    try:
+        for Delta in Deltas:
+            Queue.put(Delta)
+            yield Delta
+    finally:
+        Queue.put(None)
 
+# Render: show the query and stream the answer onto the chat screen. The turn goes to the speak stage as
+# soon as rendering starts, so the answer is spoken while it streams.
+def RenderStage(Turn):
+    ShowTextToScreen(f"{Username} : {Turn['Query']}")
+    Turn["Spoken"] = queue.Queue()
+    if not Turn["Parts"]:
+        Turn["Spoken"].put(None)
+        yield Turn
     else:
-        for Queries in Decision:
-            if "general" in Queries:
-                SetAssistantStatus("Thinking ... ")
-                QueryFinal = Queries.replace("general-", "")
-                Answer = ChatBot(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ... ")
-                TextToSpeech(Answer)
-
-            elif "realtime" in Queries:
-                SetAssistantStatus("Searching ... ")
-                QueryFinal = Queries.replace("realtime-", "")
-                Answer = RealtimeSearchEngine(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ... ")
-                TextToSpeech(Answer)
-
-            elif "exit" in Queries:
-                QueryFinal = "Okay, Bye!"
-                Answer = ChatBot(QueryModifier(QueryFinal))
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering ...")
-                TextToSpeech(Answer)
-                SetAssistantStatus("Answering ...")
-                os._exit(1)
+        SetAssistantStatus("Searching ... " if any(i.startswith("realtime") for i in Turn["Decision"]) else "Thinking ... ")
+        yield Turn
+        StreamAnswerToScreen(Relay(MergeAnswerParts(Turn["Parts"]), Turn["Spoken"]))
+
+    if Turn["Exit"] and not Turn["Cancel"].Cancelled:
+        QueryFinal = "Okay, Bye!"
+        Answer = StreamAnswerToScreen(Chatbot.ChatBotStream(QueryModifier(QueryFinal)))
+        yield {"Query": QueryFinal, "Cancel": Turn["Cancel"], "Bye": Answer}
+
+# Speak: say each answer as its deltas arrive, one turn at a time, then wait for the turn's automation.
+def SpeakStage(Turn):
+    if "Bye" in Turn:
+        SetAssistantStatus("Answering ...")
+        TextToSpeech.TextToSpeech(Turn["Bye"])
+        os._exit(1)
+
+    Speech = TextToSpeech.SpeechPipeline(Cancel=Turn["Cancel"])
+    for Delta in iter(Turn["Spoken"].get, None):
+        Speech.Feed(Delta)
+    if Turn["Parts"]:
+        SetAssistantStatus("Answering ... ")
+    Speech.Finish()
+
+    if Turn["Automation"] is not None and not Turn["Cancel"].Cancelled:
+        try:
+            Turn["Automation"].result()
+        except Exception as e:
+            print(f"Error in automation: {e}")
+    EndTurn(Turn)
+
+# Function to read the queue depths and how busy each stage has been
+def PipelineStats():
+    return TurnPipeline.Stats()
+
+# Turns cancelled while queued are dropped by the next stage without doing any of their work.
+TurnPipeline = Pipeline(Skip=lambda Turn: Turn["Cancel"].Cancelled, Discard=EndTurn)
+TurnPipeline.Add("capture", CaptureStage)
+TurnPipeline.Add("route", RouteStage)
+TurnPipeline.Add("execute", ExecuteStage)
+TurnPipeline.Add("render", RenderStage)
+TurnPipeline.Add("speak", SpeakStage, QueueSize=1)
 
 # ------------ Threads ------------
 def FirstThread():
-    while True:
-        CurrentStatus = GetMicrophoneStatus()
-        if CurrentStatus == "True":
-            MainExecution()   # no mic reset anymore
-            sleep(0.5)        # small pause to avoid spamming
-        else:
-            sleep(0.1)
+    TurnPipeline.Start()
+    for Stage in TurnPipeline.Stages:
+        Stage.Thread.join()
+
+# Function to load the backends in the background once the window is up
+def StartWarmUp():
+    Milestone("Window shown")
+    WarmUp(WarmUpSteps, OnFinished=lambda: print(StartupReport()) if ProfileStartup else None)
 
 def SecondThread():
-    GraphicalUserInterface()
+    GraphicalUserInterface(OnShown=StartWarmUp)
 
 if __name__ == "__main__":
     thread2 = threading.Thread(target=FirstThread, daemon=True)